@@ -7,6 +7,7 @@ export const Messages = () => {
     transcripts: chatMessages,
     isLoading,
     isThinking,
+    partialTranscript,
     liveSession,
     viewingSession,
   } = useCustomStore();
@@ -15,7 +16,7 @@ export const Messages = () => {
   useEffect(() => {
     if (viewingSession === liveSession)
       finalRef.current.scrollIntoView({ behaviour: "smooth" });
-  }, [chatMessages, viewingSession, liveSession]);
+  }, [chatMessages, partialTranscript, viewingSession, liveSession]);
 
   return (
     <div
@@ -41,6 +42,11 @@ export const Messages = () => {
           ))}
         </div>
       )}
+      {partialTranscript && viewingSession === liveSession && (
+        <div className="p-2 rounded opacity-70">
+          <Message content={partialTranscript} type="query" />
+        </div>
+      )}
       {isThinking ? <Loader content="Thinking..." /> : ""}
       <div ref={finalRef} />
     </div>
@@ -11,6 +11,62 @@ import useCustomStore from "../store";
 
 const ConnectionContext = createContext(null);
 
+// Output formats we can play, most preferred first. Slow or data-saver links
+// ask for 16 kHz or 8 kHz mu-law speech instead of 44.1 kHz PCM.
+const preferredAudioFormats = () => {
+  const network = navigator.connection;
+  if (network && (network.saveData || /2g|3g/.test(network.effectiveType)))
+    return ["pcm_mulaw_8000", "pcm_s16le_16000"];
+  return ["pcm_s16le_44100", "pcm_s16le_24000"];
+};
+
+const decodeMulaw = (byte) => {
+  const value = ~byte & 0xff;
+  const exponent = (value >> 4) & 0x07;
+  const magnitude = (((value & 0x0f) << 3) + 0x84) << exponent;
+  return (value & 0x80 ? 0x84 - magnitude : magnitude - 0x84) / 32768.0;
+};
+
+const decodePcm = (audioData, encoding) => {
+  if (encoding === "pcm_f32le") return new Float32Array(audioData);
+  if (encoding === "pcm_mulaw")
+    return Float32Array.from(new Uint8Array(audioData), decodeMulaw);
+  const pcmData = new Int16Array(audioData);
+  const floatData = new Float32Array(pcmData.length);
+  for (let i = 0; i < pcmData.length; i++) floatData[i] = pcmData[i] / 32768.0;
+  return floatData;
+};
+
+// Microphone audio goes up as 16 kHz 16-bit PCM
+const INPUT_SAMPLE_RATE = 16000;
+const INPUT_FORMAT = "pcm_s16le_16000";
+// Posts raw microphone samples to the main thread, 128 frames at a time
+const CAPTURE_WORKLET = `
+class PcmCapture extends AudioWorkletProcessor {
+  process(inputs) {
+    const channel = inputs[0][0];
+    if (channel) this.port.postMessage(channel.slice(0));
+    return true;
+  }
+}
+registerProcessor("pcm-capture", PcmCapture);
+`;
+
+const AUDIO_FRAME_FINAL = 0x01;
+const AUDIO_FRAME_HEADER_SIZE = 17;
+
+// Binary audio frame: flag byte, 16 raw uuid bytes, then the audio payload
+const encodeAudioFrame = (uuid, buffer, final = false) => {
+  const payloadSize = buffer ? buffer.byteLength : 0;
+  const frame = new Uint8Array(AUDIO_FRAME_HEADER_SIZE + payloadSize);
+  frame[0] = final ? AUDIO_FRAME_FINAL : 0;
+  const hex = uuid.replace(/-/g, "");
+  for (let i = 0; i < 16; i++)
+    frame[1 + i] = parseInt(hex.slice(i * 2, i * 2 + 2), 16);
+  if (buffer) frame.set(new Uint8Array(buffer), AUDIO_FRAME_HEADER_SIZE);
+  return frame;
+};
+
 export const ConnectionProvider = ({ children }) => {
   const {
     setTranscripts,
@@ -19,6 +75,7 @@ export const ConnectionProvider = ({ children }) => {
     setViewingSession,
     setIsLoading,
     setIsThinking,
+    setPartialTranscript,
     sessionTranscriptsMap,
     extendSessionTranscriptsMap,
     setContext,
@@ -32,9 +89,11 @@ export const ConnectionProvider = ({ children }) => {
   const audioContextRef = useRef(null);
   const audioQueueRef = useRef([]);
   const isPlayingRef = useRef(false);
+  const currentSourceRef = useRef(null);
   const continueRecordingRef = useRef(true);
-  const mediaRecorderRef = useRef(null);
+  const recorderRef = useRef(null);
   const uuidRef = useRef(null);
+  const audioFormatRef = useRef({ encoding: "pcm_s16le", sample_rate: 44100 });
 
   const playNextInQueue = () => {
     if (audioQueueRef.current.length === 0) {
@@ -48,9 +107,25 @@ export const ConnectionProvider = ({ children }) => {
     const source = audioContext.createBufferSource();
     source.buffer = audioBuffer;
     source.connect(audioContext.destination);
+    currentSourceRef.current = source;
 
     source.start();
-    source.onended = () => playNextInQueue();
+    source.onended = () => {
+      currentSourceRef.current = null;
+      playNextInQueue();
+    };
+  };
+
+  // Audio arrives faster than realtime, so on barge-in drop what is queued too
+  const stopPlayback = () => {
+    audioQueueRef.current = [];
+    const source = currentSourceRef.current;
+    currentSourceRef.current = null;
+    isPlayingRef.current = false;
+    if (source) {
+      source.onended = null;
+      source.stop();
+    }
   };
 
   useEffect(() => {
@@ -60,7 +135,11 @@ export const ConnectionProvider = ({ children }) => {
 
     if (!wsRef.current && !wsEndpointCalled.current) {
       wsEndpointCalled.current = true;
-      socket = new WebSocket(WS_ENDPOINT);
+      socket = new WebSocket(
+        `${WS_ENDPOINT}?formats=${preferredAudioFormats().join(
+          ","
+        )}&input_format=${INPUT_FORMAT}`
+      );
 
       socket.onerror = (error) => console.error("WebSocket error:", error);
       socket.onclose = (event) =>
@@ -75,15 +154,13 @@ export const ConnectionProvider = ({ children }) => {
         if (event.data instanceof Blob) {
           const audioData = await event.data.arrayBuffer();
           const audioContext = audioContextRef.current;
-          const pcmData = new Int16Array(audioData);
-          const floatData = new Float32Array(pcmData.length);
-          for (let i = 0; i < pcmData.length; i++)
-            floatData[i] = pcmData[i] / 32768.0;
+          const { encoding, sample_rate } = audioFormatRef.current;
+          const floatData = decodePcm(audioData, encoding);
 
           const audioBuffer = audioContext.createBuffer(
             1,
             floatData.length,
-            44100
+            sample_rate
           );
           audioBuffer.getChannelData(0).set(floatData);
 
@@ -98,12 +175,20 @@ export const ConnectionProvider = ({ children }) => {
                 setSessions(message.sessions);
                 break;
               case "tts_start":
+                if (message.format) audioFormatRef.current = message.format;
                 setIsStreamingResponse(true);
                 break;
               case "tts_stopped":
+                stopPlayback();
+                setPartialTranscript("");
+                setIsStreamingResponse(false);
+                break;
               case "tts_complete":
                 setIsStreamingResponse(false);
                 break;
+              case "tts_mode":
+                if (!message.enabled) setIsStreamingResponse(false);
+                break;
               case "transcripts":
                 setTranscripts(message.transcripts);
                 setIsLoading(false);
@@ -123,8 +208,34 @@ export const ConnectionProvider = ({ children }) => {
                 setLiveSession(message.uuid);
                 setIsLoading(false);
                 break;
+              case "transcript_delta":
+                // Audio queries only become an item once the full transcript arrives
+                if (message.input_type !== "text") break;
+                setIsThinking(false);
+                setTranscripts((prev) => {
+                  const lastItem = prev[prev.length - 1];
+                  lastItem["response"] =
+                    (lastItem["response"] || "") + message.delta;
+                  return [...prev.slice(0, prev.length - 1), lastItem];
+                });
+                break;
+              case "busy":
+                // The turn was turned away; drop the query still waiting for an answer
+                console.warn(message.message);
+                setIsThinking(false);
+                setPartialTranscript("");
+                if (message.input_type !== "text") break;
+                setTranscripts((prev) => {
+                  const lastItem = prev[prev.length - 1];
+                  return lastItem && !lastItem.response ? prev.slice(0, -1) : prev;
+                });
+                break;
+              case "partial_transcript":
+                setPartialTranscript(message.text);
+                break;
               case "transcript_item":
                 setIsThinking(false);
+                setPartialTranscript("");
                 setContext(message.context);
                 setTranscripts((prev) => {
                   if (message.response) {
@@ -191,34 +302,44 @@ export const ConnectionProvider = ({ children }) => {
   const deleteSession = (id) => sendWsMessage("delete_session", { id });
 
   const startRecording = async () => {
+    stopPlayback();
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-      const mediaRecorder = new MediaRecorder(stream);
-      mediaRecorderRef.current = mediaRecorder;
+      // Raw 16 kHz PCM lets the server detect speech and trim silence
+      const context = new AudioContext({ sampleRate: INPUT_SAMPLE_RATE });
+      await context.audioWorklet.addModule(
+        URL.createObjectURL(
+          new Blob([CAPTURE_WORKLET], { type: "application/javascript" })
+        )
+      );
+      const source = context.createMediaStreamSource(stream);
+      const capture = new AudioWorkletNode(context, "pcm-capture");
+      let blocks = [];
+      let sampleCount = 0;
 
-      mediaRecorder.ondataavailable = async (event) => {
+      capture.port.onmessage = ({ data }) => {
         if (
-          event.data.size > 0 &&
-          wsRef.current.readyState === WebSocket.OPEN
-        ) {
-          const buffer = await event.data.arrayBuffer();
-          const base64Data = btoa(
-            String.fromCharCode(...new Uint8Array(buffer))
-          );
-
-          if (!continueRecordingRef.current) return;
+          !continueRecordingRef.current ||
+          wsRef.current.readyState !== WebSocket.OPEN
+        )
+          return;
+        blocks.push(data);
+        sampleCount += data.length;
+        // Send every 100ms of audio
+        if (sampleCount < INPUT_SAMPLE_RATE / 10) return;
 
-          wsRef.current.send(
-            JSON.stringify({
-              type: "audio",
-              audio: `data:audio/mp3;base64,${base64Data}`,
-              uuid: uuidRef.current,
-            })
-          );
-        }
+        const pcm = new Int16Array(sampleCount);
+        let offset = 0;
+        for (const block of blocks)
+          for (let i = 0; i < block.length; i++)
+            pcm[offset++] = Math.max(-1, Math.min(1, block[i])) * 0x7fff;
+        blocks = [];
+        sampleCount = 0;
+        wsRef.current.send(encodeAudioFrame(uuidRef.current, pcm.buffer));
       };
 
-      mediaRecorder.start(100); // Collect data every 100ms
+      source.connect(capture);
+      recorderRef.current = { stream, context };
       setIsRecording(true);
     } catch (error) {
       console.error("Error accessing microphone:", error);
@@ -226,17 +347,14 @@ export const ConnectionProvider = ({ children }) => {
   };
 
   const stopRecording = () => {
-    if (mediaRecorderRef.current && isRecording) {
-      mediaRecorderRef.current.stop();
-      mediaRecorderRef.current.stream
-        .getTracks()
-        .forEach((track) => track.stop());
+    if (recorderRef.current && isRecording) {
+      recorderRef.current.context.close();
+      recorderRef.current.stream.getTracks().forEach((track) => track.stop());
+      recorderRef.current = null;
       setIsRecording(false);
       continueRecordingRef.current = false;
 
-      wsRef.current.send(
-        JSON.stringify({ type: "audio", final: true, uuid: uuidRef.current })
-      );
+      wsRef.current.send(encodeAudioFrame(uuidRef.current, null, true));
       // Ideally this should happen after the model responds
       setTimeout(() => {
         continueRecordingRef.current = true;
@@ -244,7 +362,10 @@ export const ConnectionProvider = ({ children }) => {
     }
   };
 
-  const stopStreamingResponse = () => sendWsMessage("kill_streaming");
+  const stopStreamingResponse = () => {
+    stopPlayback();
+    sendWsMessage("kill_streaming");
+  };
 
   return (
     <ConnectionContext.Provider
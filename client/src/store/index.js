@@ -14,6 +14,8 @@ const useCustomStore = create((set) => {
     enableAudioResponse: true,
     isLoading: true,
     isThinking: false,
+    // What the user has said so far while recording, from the server's STT
+    partialTranscript: "",
     liveSession: null,
     viewingSession: null,
     context: "",
@@ -27,6 +29,7 @@ const useCustomStore = create((set) => {
       })),
     setIsLoading: (val) => set({ isLoading: val }),
     setIsThinking: (val) => set({ isThinking: val }),
+    setPartialTranscript: (val) => set({ partialTranscript: val }),
     setEnableAudioResponse: (val) => set({ enableAudioResponse: val }),
     setSessions: createSetter("sessions"),
     setTranscripts: createSetter("transcripts"),
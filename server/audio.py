@@ -0,0 +1,119 @@
+from typing import Optional
+from config import config
+import io
+import logging
+import os
+import time
+import wave
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap mono 16-bit PCM in a WAV header so models and files can read it."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return out.getvalue()
+
+
+def mime_type_for(audio: bytes) -> str:
+    """WAV for utterances built from PCM input, else whatever the recorder sends."""
+    return "audio/wav" if audio[:4] == b"RIFF" else config["audio_mime_type"]
+
+
+class AudioBuffer:
+    """Growable per-session byte buffer written through a memoryview, so chunks
+    are copied once on the way in and the backing storage is reused across turns."""
+
+    def __init__(self, initial_capacity: int = 64 * 1024):
+        self._data = bytearray(initial_capacity)
+        self._view = memoryview(self._data)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self._data):
+            return
+        capacity = len(self._data) or 1
+        while capacity < needed:
+            capacity *= 2
+        # A bytearray can't be resized while a memoryview is exported
+        self._view.release()
+        self._data.extend(bytes(capacity - len(self._data)))
+        self._view = memoryview(self._data)
+
+    def append(self, chunk: bytes) -> None:
+        self._reserve(len(chunk))
+        self._view[self.size : self.size + len(chunk)] = chunk
+        self.size += len(chunk)
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the buffered audio, valid until the next append or clear."""
+        return self._view[: self.size]
+
+    def take(self) -> bytes:
+        """Return the buffered audio and reset the buffer, keeping its capacity."""
+        data = bytes(self.view())
+        self.size = 0
+        return data
+
+    def clear(self) -> None:
+        self.size = 0
+
+
+class MediaStore:
+    """Optional on-disk copy of user audio, with age and count based retention."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        retention_seconds: Optional[int] = None,
+        max_files: Optional[int] = None,
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.directory = directory if directory is not None else config["media_dir"]
+        self.retention_seconds = retention_seconds or config["media_retention_seconds"]
+        self.max_files = max_files or config["media_max_files"]
+        self._last_cleanup = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def save(self, file_name: str, data: bytes) -> Optional[str]:
+        if not self.enabled:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, file_name)
+        with open(path, "wb") as f:
+            f.write(data)
+        # Sweeping on every save would stat the whole directory per utterance
+        if time.time() - self._last_cleanup > 60:
+            self.cleanup()
+        return path
+
+    def cleanup(self) -> int:
+        """Delete files past the retention age or beyond the file cap. Returns the count removed."""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        self._last_cleanup = time.time()
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        cutoff = time.time() - self.retention_seconds
+        removed = 0
+        for index, entry in enumerate(entries):
+            if index >= self.max_files or entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    self.logger.warning("Could not remove %s: %s", entry.path, str(e))
+        return removed
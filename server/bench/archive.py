@@ -0,0 +1,129 @@
+"""Archive and restore throughput of the transcript tiering job.
+
+Seeds sessions with generated conversations into the Redis configured by the
+REDIS_* env vars (use a scratch database), or into fakeredis with --fake (the
+bench extra), then archives them and reads them back. Reports archive
+throughput, payload bytes before and after (and Redis MEMORY USAGE where the
+server supports it), and fetch_transcript throughput for hot sessions, cold
+archives and cached archives. Seeded keys are removed afterwards unless --keep.
+
+    python bench/archive.py --sessions 2000 --turns 20 --fake
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import config  # noqa: E402
+from db_manager import AsyncDBManager  # noqa: E402
+from transcript_archive import TranscriptArchiver, archive_key  # noqa: E402
+
+WORDS = (
+    "the a to and of you it that is for in on this can with your be what about "
+    "sure let me help here how would like could time call script customer order "
+    "account payment delivery tomorrow today thanks great question answer check"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+async def seed(db: AsyncDBManager, sessions: int, turns: int) -> list:
+    rng = random.Random(0)
+    session_ids = [f"bench-archive-{i}" for i in range(sessions)]
+    for session_id in session_ids:
+        async with db.redis_client.pipeline(transaction=False) as pipe:
+            for _ in range(turns):
+                pipe.rpush(
+                    f"session:{session_id}",
+                    '{"query": "%s", "response": "%s"}'
+                    % (sentence(rng, 12), " ".join(sentence(rng, 15) for _ in range(4))),
+                )
+            pipe.set(f"session:{session_id}:context", sentence(rng, 150))
+            pipe.hset(f"session:{session_id}:meta", mapping={"turns": turns, "updated": 0})
+            pipe.zadd("sessions", {session_id: 0})
+            await pipe.execute()
+    return session_ids
+
+
+async def memory_usage(db: AsyncDBManager, session_ids: list) -> int:
+    """Bytes Redis reports for the sessions' transcript, context and archive keys."""
+    try:
+        async with db.redis_client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                for key in (
+                    f"session:{session_id}",
+                    f"session:{session_id}:context",
+                    archive_key(session_id),
+                ):
+                    pipe.memory_usage(key)
+            return sum(size or 0 for size in await pipe.execute())
+    except Exception:
+        return 0
+
+
+async def read_all(db: AsyncDBManager, session_ids: list) -> float:
+    started = time.perf_counter()
+    for session_id in session_ids:
+        await db.fetch_transcript(session_id)
+    return len(session_ids) / (time.perf_counter() - started)
+
+
+async def main(args) -> None:
+    config["archive_codec"] = args.codec
+    if args.fake:
+        # The pool is never used, but reads its settings on creation
+        os.environ.setdefault("REDIS_PORT", "6379")
+    db = AsyncDBManager()
+    if args.fake:
+        import fakeredis
+
+        db.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    db.archive_cache.max_entries = args.sessions
+
+    session_ids = await seed(db, args.sessions, args.turns)
+    memory_before = await memory_usage(db, session_ids)
+    hot_reads = await read_all(db, session_ids)
+
+    archiver = TranscriptArchiver(db)
+    before = after = 0
+    started = time.perf_counter()
+    for session_id in session_ids:
+        sizes = await archiver.archive_session(session_id)
+        before += sizes[0]
+        after += sizes[1]
+    archive_seconds = time.perf_counter() - started
+    memory_after = await memory_usage(db, session_ids)
+
+    cold_reads = await read_all(db, session_ids)
+    cached_reads = await read_all(db, session_ids)
+
+    print(f"codec                      {args.codec}")
+    print(f"archived sessions/s        {len(session_ids) / archive_seconds:10.1f}")
+    print(f"archived MB/s              {before / archive_seconds / 1e6:10.2f}")
+    print(f"payload bytes              {before:10} -> {after} ({before / after:.1f}x)")
+    if memory_before:
+        print(f"redis memory bytes         {memory_before:10} -> {memory_after}")
+    print(f"hot fetch_transcript/s     {hot_reads:10.1f}")
+    print(f"cold fetch_transcript/s    {cold_reads:10.1f}")
+    print(f"cached fetch_transcript/s  {cached_reads:10.1f}")
+
+    if not args.keep:
+        for session_id in session_ids:
+            await db.delete_session(session_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--codec", default="zlib", choices=["zlib", "zstd"])
+    parser.add_argument("--fake", action="store_true", help="use fakeredis")
+    parser.add_argument("--keep", action="store_true", help="keep seeded keys")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""Server CPU per second of ingested push-to-talk audio, JSON/base64 vs binary frames.
+
+Drives Connection directly with a stub socket, so only the ingest path
+(frame parsing, decoding, buffering) is measured, not the LLM or TTS.
+
+    python bench/audio_ingest.py --seconds 600
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+import types
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from audio import MediaStore  # noqa: E402
+from connection import AUDIO_FRAME_HEADER_SIZE, Connection  # noqa: E402
+from scheduler import TurnScheduler  # noqa: E402
+
+
+class NullSocket:
+    async def send_json(self, data):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+
+def make_connection() -> Connection:
+    pool = types.SimpleNamespace(
+        llm=None,
+        tts=None,
+        stt=None,
+        db=None,
+        context_cache=None,
+        media_store=MediaStore(directory=""),
+        scheduler=TurnScheduler(),
+    )
+    connection = Connection(pool)
+    connection.frontend_ws = NullSocket()
+    connection.is_connected = True
+    # Only ingest is measured, so never start a turn
+    connection.start_turn = lambda *args: None
+    return connection
+
+
+async def run_json(connection, session_id, chunks) -> None:
+    for chunk in chunks:
+        raw = json.dumps(
+            {
+                "type": "audio",
+                "audio": "data:audio/mp3;base64," + base64.b64encode(chunk).decode(),
+                "uuid": session_id,
+            }
+        )
+        await connection.handle_message(json.loads(raw))
+    await connection.handle_message(
+        json.loads(json.dumps({"type": "audio", "final": True, "uuid": session_id}))
+    )
+
+
+async def run_binary(connection, session_id, chunks) -> None:
+    header = bytes([0]) + uuid.UUID(session_id).bytes
+    for chunk in chunks:
+        await connection.handle_audio_frame(header + chunk)
+    await connection.handle_audio_frame(bytes([1]) + header[1:AUDIO_FRAME_HEADER_SIZE])
+
+
+def measure(runner, args) -> dict:
+    chunk_size = args.bitrate_kbps * 1000 // 8 * args.chunk_ms // 1000
+    chunks = [os.urandom(chunk_size) for _ in range(1000 // args.chunk_ms)]
+    session_id = str(uuid.uuid4())
+    connection = make_connection()
+
+    async def main():
+        for _ in range(args.seconds):
+            await runner(connection, session_id, chunks)
+
+    if runner is run_json:
+        encoded = base64.b64encode(chunks[0]).decode()
+        frame_size = len(
+            json.dumps(
+                {"type": "audio", "audio": "data:audio/mp3;base64," + encoded, "uuid": session_id}
+            )
+        )
+    else:
+        frame_size = AUDIO_FRAME_HEADER_SIZE + chunk_size
+    wire_bytes = frame_size * len(chunks)
+
+    start = time.process_time()
+    asyncio.run(main())
+    cpu = time.process_time() - start
+    return {
+        "cpu_us_per_audio_second": cpu / args.seconds * 1e6,
+        "wire_bytes_per_audio_second": wire_bytes,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=300, help="audio seconds per path")
+    parser.add_argument("--bitrate-kbps", type=int, default=128)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    args = parser.parse_args()
+
+    results = {"json_base64": measure(run_json, args), "binary": measure(run_binary, args)}
+    for name, result in results.items():
+        print(
+            f"{name:12} cpu={result['cpu_us_per_audio_second']:8.1f}us/s "
+            f"wire={result['wire_bytes_per_audio_second'] / 1024:6.1f}KiB/s"
+        )
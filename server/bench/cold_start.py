@@ -0,0 +1,123 @@
+"""Cold start of a fresh server process.
+
+Every run starts a new interpreter and reports, from the moment it was
+spawned: how long `import main` takes, how long `uvicorn main:app` takes to
+hand the first websocket its session uuid, and how long until /health reports
+the provider clients ready. Medians over --runs.
+
+Needs a Redis for /connect: REDIS_HOST/REDIS_PORT, or --fake for an in-process
+fakeredis TCP server (bench extra). No provider keys are needed, nothing is
+sent to them.
+
+    python bench/cold_start.py --runs 10 --fake
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import websockets  # noqa: E402
+from workers import free_port, start_fake_redis  # noqa: E402
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_MAIN = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_seconds() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_MAIN],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+async def first_session(port: int, started: float, timeout: float) -> float:
+    deadline = started + timeout
+    while True:
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}/connect") as ws:
+                while True:
+                    message = json.loads(await ws.recv())
+                    if message.get("uuid"):
+                        return time.perf_counter() - started
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.01)
+
+
+def clients_ready(port: int, started: float, timeout: float) -> float:
+    deadline = started + timeout
+    while True:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as resp:
+            if json.load(resp)["clients_ready"]:
+                return time.perf_counter() - started
+        if time.perf_counter() > deadline:
+            raise TimeoutError("provider clients never became ready")
+        time.sleep(0.01)
+
+
+def measure(args) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=SERVER_DIR,
+    )
+    try:
+        session = asyncio.run(first_session(port, started, args.timeout))
+        ready = clients_ready(port, started, args.timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_session_s": session, "clients_ready_s": ready}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fake", action="store_true", help="use an in-process fakeredis server")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    for key in ("GOOGLE_API_KEY", "CARTESIA_API_KEY"):
+        os.environ.setdefault(key, "offline")
+    if args.fake:
+        os.environ["REDIS_HOST"] = "127.0.0.1"
+        os.environ["REDIS_PORT"] = str(start_fake_redis())
+        os.environ["REDIS_USERNAME"] = ""
+        os.environ["REDIS_PASSWORD"] = ""
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    runs = [measure(args) for _ in range(args.runs)]
+    result = {
+        "import_main_s": statistics.median(imports),
+        "first_session_s": statistics.median(r["first_session_s"] for r in runs),
+        "clients_ready_s": statistics.median(r["clients_ready_s"] for r in runs),
+    }
+    print(
+        f"import main {result['import_main_s'] * 1000:7.1f}ms  "
+        f"first session {result['first_session_s'] * 1000:7.1f}ms  "
+        f"clients ready {result['clients_ready_s'] * 1000:7.1f}ms  "
+        f"(medians of {args.runs})"
+    )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"params": vars(args), "result": result}, f, indent=2)
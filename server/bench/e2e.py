@@ -0,0 +1,356 @@
+"""End-to-end benchmark of the whole /connect pipeline, fully offline.
+
+Starts the FastAPI app in-process under uvicorn. Gemini is replaced by a fake
+genai client behind the real GeminiLLM (so response parsing, the context cache
+and compaction still run), Cartesia by LocalTTS, STT by LocalSTT, and Redis by
+fakeredis behind the real AsyncDBManager. N simulated clients then hold
+conversations of text and push-to-talk PCM turns over real websockets.
+
+Reports p50/p95/p99 time to first audio and turn latency, throughput and RSS
+growth. --out saves the results as JSON; --compare fails if p95s regressed
+against a saved run, so the bench can gate changes to the turn pipeline.
+Needs the bench extra for fakeredis: pip install -e ".[bench]".
+
+    python bench/e2e.py --clients 50 --turns 10 --out before.json
+    python bench/e2e.py --clients 50 --turns 10 --compare before.json
+"""
+
+import argparse
+import array
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import types
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# The real clients are built at import time but never used
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("CARTESIA_API_KEY", "bench")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+
+import main  # noqa: E402
+from connection import AUDIO_FRAME_FINAL  # noqa: E402
+from stt import LocalSTT  # noqa: E402
+from tts import LocalTTS  # noqa: E402
+
+ANSWER = (
+    "Sure, happy to help with that. Here is a short answer that runs for a few "
+    "sentences, so the audio pipeline has something to stream. Let me know if "
+    "you want more detail on any part of it!"
+)
+PCM_SAMPLE_RATE = 16000
+
+
+class FakeGenAIClient:
+    """Stands in for genai.Client: answers in the JSON schema GeminiLLM asks for,
+    streamed in small chunks with a configurable delay before the first one."""
+
+    def __init__(self, first_token_ms: int, chunk_ms: int, chunk_chars: int = 12):
+        self.first_token = first_token_ms / 1000
+        self.chunk_delay = chunk_ms / 1000
+        self.chunk_chars = chunk_chars
+        self.aio = types.SimpleNamespace(
+            models=types.SimpleNamespace(
+                generate_content=self.generate_content,
+                generate_content_stream=self.generate_content_stream,
+            ),
+        )
+
+    @staticmethod
+    def _answer(contents) -> str:
+        query = contents[0] if contents and isinstance(contents[0], str) else ""
+        return json.dumps(
+            {"query": query[-80:], "response": ANSWER, "context": "Asked: " + query[-40:]}
+        )
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.first_token)
+        if config is None:
+            # Context compaction asks for plain text
+            return types.SimpleNamespace(text="Earlier turns, condensed.")
+        return types.SimpleNamespace(text=self._answer(contents))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        text = self._answer(contents)
+
+        async def chunks():
+            await asyncio.sleep(self.first_token)
+            for start in range(0, len(text), self.chunk_chars):
+                yield types.SimpleNamespace(text=text[start : start + self.chunk_chars])
+                await asyncio.sleep(self.chunk_delay)
+
+        return chunks()
+
+
+def speech_pcm(speech_ms: int, silence_ms: int) -> list:
+    """100ms frames of silence, a loud tone, then silence again."""
+
+    def tone(ms: int, amplitude: int) -> bytes:
+        count = PCM_SAMPLE_RATE * ms // 1000
+        return array.array(
+            "h",
+            (
+                int(amplitude * math.sin(2 * math.pi * 220 * i / PCM_SAMPLE_RATE))
+                for i in range(count)
+            ),
+        ).tobytes()
+
+    silence, speech = tone(100, 0), tone(100, 6000)
+    quiet = [silence] * (silence_ms // 100)
+    return quiet + [speech] * (speech_ms // 100) + quiet
+
+
+def audio_frame(session_id: str, payload: bytes, final: bool = False) -> bytes:
+    flags = AUDIO_FRAME_FINAL if final else 0
+    return bytes([flags]) + uuid.UUID(session_id).bytes + payload
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current RSS, but still shows growth; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def new_samples() -> dict:
+    return {
+        "time_to_first_audio": [],
+        "turn_latency": [],
+        "text_turns": 0,
+        "audio_turns": 0,
+        "errors": 0,
+        "rejected": 0,
+    }
+
+
+async def session_id_from(ws) -> str:
+    while True:
+        message = json.loads(await ws.recv())
+        if message["type"] == "uuid":
+            return message["uuid"]
+
+
+async def run_turn(
+    ws, session_id: str, turn: int, kind: str, args, frames: list, samples: dict
+) -> None:
+    """Send one text or push-to-talk turn and wait until its audio has played."""
+    if kind == "audio":
+        for frame in frames:
+            await ws.send(audio_frame(session_id, frame))
+            if args.realtime_audio:
+                await asyncio.sleep(0.1)
+        await ws.send(audio_frame(session_id, b"", final=True))
+    else:
+        await ws.send(
+            json.dumps(
+                {
+                    "type": "text",
+                    # Unique per session, so the LLM response cache doesn't answer
+                    "text": f"Question {turn} from client {session_id[:8]}",
+                    "uuid": session_id,
+                    "stream": True,
+                }
+            )
+        )
+    start = time.perf_counter()
+
+    first_audio = None
+    while True:
+        message = await asyncio.wait_for(ws.recv(), timeout=args.turn_timeout)
+        if isinstance(message, bytes):
+            if first_audio is None:
+                first_audio = time.perf_counter() - start
+            continue
+        message_type = json.loads(message)["type"]
+        if message_type == "error":
+            samples["errors"] += 1
+            break
+        if message_type == "busy":
+            # Shed by the turn scheduler before any work was done
+            samples["rejected"] += 1
+            break
+        if message_type == "tts_complete":
+            samples["turn_latency"].append(time.perf_counter() - start)
+            samples[f"{kind}_turns"] += 1
+            break
+    if first_audio is not None:
+        samples["time_to_first_audio"].append(first_audio)
+
+
+async def run_client(url: str, args, frames: list, samples: dict, seed: int) -> None:
+    rng = random.Random(seed)
+    async with websockets.connect(url, max_size=None) as ws:
+        session_id = await session_id_from(ws)
+        for turn in range(args.turns):
+            kind = "audio" if rng.random() < args.audio_ratio else "text"
+            await run_turn(ws, session_id, turn, kind, args, frames, samples)
+            await asyncio.sleep(args.think_ms / 1000)
+
+
+def install_fakes(args, fake_redis: bool = True) -> None:
+    """Swap every external provider for an offline one. Without fake_redis the
+    app keeps the Redis from REDIS_HOST/REDIS_PORT, e.g. to share it between
+    processes."""
+    pool = main.session_manager.pool
+    if fake_redis:
+        import fakeredis
+
+        pool.db.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    pool.llm.client = FakeGenAIClient(args.llm_first_token_ms, args.llm_chunk_ms)
+    # The prompt cache holds its own real client; the fake one has no caches
+    pool.llm.prompt_cache = None
+    pool._tts = LocalTTS(first_chunk_ms=args.tts_first_chunk_ms, speedup=args.tts_speedup)
+    pool._stt = LocalSTT()
+
+
+async def run(args) -> dict:
+    install_fakes(args)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    url = f"ws://127.0.0.1:{port}/connect?input_format=pcm_s16le_16000"
+    frames = speech_pcm(args.speech_ms, 300)
+    samples = new_samples()
+    rss_start = rss_bytes()
+    rss_peak = rss_start
+
+    async def sample_rss():
+        nonlocal rss_peak
+        while True:
+            rss_peak = max(rss_peak, rss_bytes())
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(run_client(url, args, frames, samples, seed) for seed in range(args.clients))
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        await main.session_manager.pool.drain()
+        server.should_exit = True
+        await serving
+    rss_end = rss_bytes()
+
+    return {
+        **summarize(samples, elapsed),
+        "rss_start_mb": rss_start / 2**20,
+        "rss_peak_mb": rss_peak / 2**20,
+        "rss_growth_mb": (rss_end - rss_start) / 2**20,
+    }
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    turns = samples["text_turns"] + samples["audio_turns"]
+    results = {
+        "turns": turns,
+        "text_turns": samples["text_turns"],
+        "audio_turns": samples["audio_turns"],
+        "errors": samples["errors"],
+        "rejected": samples["rejected"],
+        "elapsed_s": elapsed,
+        "throughput_turns_per_s": turns / elapsed if elapsed else 0.0,
+    }
+    for name in ("time_to_first_audio", "turn_latency"):
+        for label, pct in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            results[f"{name}_{label}_ms"] = percentile(samples[name], pct) * 1000
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    """Print p95 deltas against a saved run; False if any got worse than tolerance."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    ok = True
+    for key in sorted(k for k in results if k.endswith("_p95_ms")):
+        before, after = baseline.get(key), results[key]
+        if not before:
+            continue
+        change = (after - before) / before
+        regressed = change > tolerance
+        ok = ok and not regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:32} {before:9.1f} -> {after:9.1f}ms ({change:+.0%}){flag}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5, help="turns per client")
+    parser.add_argument("--audio-ratio", type=float, default=0.5)
+    parser.add_argument("--speech-ms", type=int, default=1000)
+    parser.add_argument("--realtime-audio", action="store_true")
+    parser.add_argument("--think-ms", type=int, default=100)
+    parser.add_argument("--llm-first-token-ms", type=int, default=300)
+    parser.add_argument("--llm-chunk-ms", type=int, default=20)
+    parser.add_argument("--tts-first-chunk-ms", type=int, default=100)
+    parser.add_argument("--tts-speedup", type=float, default=4)
+    parser.add_argument("--turn-timeout", type=float, default=30)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON from an earlier run to compare p95s with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    for key, value in results.items():
+        print(f"{key:32} {value:10.2f}" if isinstance(value, float) else f"{key:32} {value:10}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(
+                {
+                    "revision": git_revision(),
+                    "timestamp": time.time(),
+                    "params": vars(args),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
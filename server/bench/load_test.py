@@ -0,0 +1,134 @@
+"""Open many concurrent /connect sockets and check that every client gets its
+own isolated session while they all hold conversations on the shared pool.
+
+Each client sends --rounds get_sessions requests, then --turns text turns and
+waits for each answer's audio. Against a running server:
+
+    uvicorn main:app
+    python bench/load_test.py --clients 300
+
+or with --offline, against the app served in-process with the fake LLM, local
+TTS and fakeredis from e2e.py (no server, keys or Redis needed, but the bench
+extra installed):
+
+    python bench/load_test.py --clients 300 --offline
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+async def run_client(url: str, args, latencies: list, samples: dict) -> str:
+    async with websockets.connect(url, max_size=None) as ws:
+        session_id = None
+        while session_id is None:
+            message = json.loads(await ws.recv())
+            if message["type"] == "uuid":
+                session_id = message["uuid"]
+
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            await ws.send(json.dumps({"type": "get_sessions", "uuid": session_id}))
+            while True:
+                message = await ws.recv()
+                if isinstance(message, str) and json.loads(message)["type"] == "sessions":
+                    break
+            latencies.append(time.perf_counter() - start)
+
+        for turn in range(args.turns):
+            await e2e.run_turn(ws, session_id, turn, "text", args, [], samples)
+
+        return session_id
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def serve_offline(args):
+    """Serve the app in this process with every external provider faked."""
+    import uvicorn
+
+    e2e.install_fakes(args)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(e2e.main.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, serving, f"ws://127.0.0.1:{port}/connect"
+
+
+async def main(args) -> None:
+    url = args.url
+    if args.offline:
+        server, serving, url = await serve_offline(args)
+    latencies = []
+    samples = e2e.new_samples()
+    start = time.perf_counter()
+    try:
+        session_ids = await asyncio.gather(
+            *(run_client(url, args, latencies, samples) for _ in range(args.clients))
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        if args.offline:
+            await e2e.main.session_manager.pool.drain()
+            server.should_exit = True
+            await serving
+
+    assert len(set(session_ids)) == args.clients, "sessions leaked between sockets"
+    print(f"clients={args.clients} distinct_sessions={len(set(session_ids))}")
+    print(f"requests={len(latencies)} elapsed={elapsed:.2f}s")
+    print(
+        f"latency mean={statistics.mean(latencies) * 1000:.1f}ms "
+        f"p95={percentile(latencies, 0.95) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 0.99) * 1000:.1f}ms"
+    )
+    if args.turns:
+        turns = e2e.summarize(samples, elapsed)
+        print(
+            f"turns={turns['turns']} errors={turns['errors']} "
+            f"rejected busy={turns['rejected']} "
+            f"{turns['throughput_turns_per_s']:.1f} turns/s "
+            f"first audio p95={turns['time_to_first_audio_p95_ms']:.1f}ms "
+            f"turn p95={turns['turn_latency_p95_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://localhost:8000/connect")
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=2, help="text turns per client")
+    parser.add_argument("--turn-timeout", type=float, default=60)
+    parser.add_argument("--offline", action="store_true", help="serve the app in-process")
+    parser.add_argument("--llm-first-token-ms", type=int, default=300)
+    parser.add_argument("--llm-chunk-ms", type=int, default=20)
+    parser.add_argument("--tts-first-chunk-ms", type=int, default=100)
+    parser.add_argument("--tts-speedup", type=float, default=4)
+    args = parser.parse_args()
+    # The turn helpers live with the e2e bench, which imports the app
+    import e2e
+
+    if args.offline:
+        logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main(args))
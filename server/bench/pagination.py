@@ -0,0 +1,98 @@
+"""Full vs paginated session listing and transcript fetch.
+
+Seeds one session with 10k turns and 100k "bench-*" sessions into the
+Redis configured by the REDIS_* env vars (use a scratch database), or into
+fakeredis with --fake (from the bench extra). Seeded keys are removed
+afterwards unless --keep.
+
+    python bench/pagination.py --sessions 100000 --turns 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from db_manager import AsyncDBManager  # noqa: E402
+
+
+async def seed(db: AsyncDBManager, sessions: int, turns: int) -> str:
+    client = db.redis_client
+    batch = 5000
+    for start in range(0, sessions, batch):
+        async with client.pipeline(transaction=False) as pipe:
+            for i in range(start, min(start + batch, sessions)):
+                session_id = f"bench-{i}"
+                pipe.zadd("sessions", {session_id: i})
+                pipe.hset(
+                    f"session:{session_id}:meta",
+                    mapping={"title": f"Session {i}", "turns": 3, "updated": i},
+                )
+            await pipe.execute()
+
+    heavy = "bench-heavy"
+    entry = json.dumps({"query": "q" * 80, "response": "r" * 400})
+    for start in range(0, turns, batch):
+        await client.rpush(f"session:{heavy}", *([entry] * min(batch, turns - start)))
+    return heavy
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def main(args) -> None:
+    if args.fake:
+        # The pool is never used, but reads its settings on creation
+        os.environ.setdefault("REDIS_PORT", "6379")
+    db = AsyncDBManager()
+    if args.fake:
+        import fakeredis
+
+        db.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    heavy = await seed(db, args.sessions, args.turns)
+
+    async def page_of_sessions():
+        await db.fetch_session_meta(await db.list_sessions(0, args.page))
+
+    results = {
+        "list_sessions_all_ms": await timed(db.list_sessions, args.repeat),
+        "session_page_with_meta_ms": await timed(page_of_sessions, args.repeat),
+        "fetch_transcript_all_ms": await timed(
+            lambda: db.fetch_transcript(heavy), args.repeat
+        ),
+        "fetch_transcript_page_ms": await timed(
+            lambda: db.fetch_transcript_page(heavy, limit=args.page), args.repeat
+        ),
+    }
+    for name, value in results.items():
+        print(f"{name:28} {value:9.2f}")
+
+    if not args.keep:
+        await db.redis_client.zrem("sessions", heavy)
+        await db.redis_client.delete(f"session:{heavy}")
+        for start in range(0, args.sessions, 5000):
+            ids = [f"bench-{i}" for i in range(start, min(start + 5000, args.sessions))]
+            await db.redis_client.zrem("sessions", *ids)
+            await db.redis_client.delete(*(f"session:{i}:meta" for i in ids))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=10_000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fake", action="store_true", help="use fakeredis instead of REDIS_*")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded keys in place")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,176 @@
+"""Checks provider prompt caching against a fake Gemini client, offline.
+
+Runs turns through the real GeminiLLM and checks that the cached content is
+created once and its handle reused across turns and sessions, refreshed before
+it expires, and that requests fall back to inline instructions when caching is
+unavailable or the handle is rejected. Reports the instruction characters
+that were not resent.
+
+    python bench/prompt_cache.py
+"""
+
+import asyncio
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import e2e  # noqa: E402
+import httpx  # noqa: E402
+from google.genai import errors  # noqa: E402
+from context_cache import SessionContextCache  # noqa: E402
+from llm import GeminiLLM, GeminiPromptCache  # noqa: E402
+
+
+def client_error(code: int, message: str) -> errors.ClientError:
+    return errors.ClientError(code, httpx.Response(code, json={"error": {"message": message}}))
+
+
+class FakeCachingClient(e2e.FakeGenAIClient):
+    """Adds the caches API and rejects requests naming a cache it doesn't hold."""
+
+    def __init__(self, cacheable: bool = True):
+        super().__init__(first_token_ms=5, chunk_ms=0)
+        self.cacheable = cacheable
+        self.caches = {}
+        self.creates = 0
+        self.updates = 0
+        self.requests = []
+        self.aio.caches = types.SimpleNamespace(create=self.create, update=self.update)
+
+    async def create(self, model, config):
+        self.creates += 1
+        await asyncio.sleep(0.02)
+        if not self.cacheable:
+            raise client_error(400, "Cached content is too small")
+        name = f"cachedContents/{self.creates}"
+        self.caches[name] = config
+        return types.SimpleNamespace(name=name)
+
+    async def update(self, name, config):
+        self.updates += 1
+        if name not in self.caches:
+            raise client_error(404, "Cached content not found")
+        return types.SimpleNamespace(name=name)
+
+    def _check(self, config):
+        name = config.get("cached_content")
+        self.requests.append(name)
+        if name and name not in self.caches:
+            raise client_error(404, "Cached content not found")
+        if name and "system_instruction" in config:
+            raise client_error(400, "Cached content and system_instruction are exclusive")
+
+    async def generate_content(self, model, contents, config=None):
+        if config is not None:
+            self._check(config)
+        return await super().generate_content(model, contents, config)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        chunks = await super().generate_content_stream(model, contents, config)
+
+        async def checked():
+            # Like the real client, the request is only made on the first chunk
+            self._check(config)
+            async for chunk in chunks:
+                yield chunk
+
+        return checked()
+
+
+def make_llm(client: FakeCachingClient, **cache_options) -> GeminiLLM:
+    llm = GeminiLLM(session_cache=SessionContextCache(None))
+    llm.client = client
+    llm.prompt_cache = GeminiPromptCache(
+        client, llm.model_name, llm.system_instruction, llm.prompt_prefix, **cache_options
+    )
+    return llm
+
+
+async def turn(llm: GeminiLLM, session: str, index: int, stream: bool = True) -> dict:
+    if not stream:
+        return await llm.agenerate_response(session, f"Question {index}", None)
+    async for chunk in llm.astream_response(session, f"Question {index}", None):
+        resp = chunk
+    return resp
+
+
+async def reused_across_turns() -> bool:
+    client = FakeCachingClient()
+    llm = make_llm(client)
+    for i in range(20):
+        resp = await turn(llm, f"session-{i % 4}", i, stream=i % 2 == 0)
+        assert resp["response"] == e2e.ANSWER, resp
+    # Requests go inline while the cache is created in the background, and
+    # reference it from then on
+    cached = [name for name in client.requests if name]
+    first = client.requests.index(cached[0]) if cached else len(client.requests)
+    saved = len(cached) * (len(llm.system_instruction) + len(llm.prompt_prefix))
+    print(
+        f"  {len(cached)}/{len(client.requests)} requests used the cache, "
+        f"{saved} instruction chars not resent"
+    )
+    return (
+        client.creates == 1
+        and len(set(cached)) == 1
+        and all(client.requests[first:])
+    )
+
+
+async def refreshed_before_expiry() -> bool:
+    client = FakeCachingClient()
+    llm = make_llm(client, ttl_seconds=1, refresh_seconds=0.5)
+    for i in range(8):
+        await turn(llm, "session", i)
+        await asyncio.sleep(0.2)
+    return client.creates == 1 and client.updates >= 2 and client.requests[-1] is not None
+
+
+async def inline_when_uncacheable() -> bool:
+    client = FakeCachingClient(cacheable=False)
+    llm = make_llm(client, retry_seconds=60)
+    results = [await turn(llm, "session", i) for i in range(5)]
+    return (
+        client.creates == 1
+        and not any(client.requests)
+        and all(r["response"] == e2e.ANSWER for r in results)
+    )
+
+
+async def retried_inline_when_rejected() -> bool:
+    client = FakeCachingClient()
+    llm = make_llm(client, retry_seconds=0.1)
+    await turn(llm, "session", 0)
+    await asyncio.sleep(0.05)
+    # The cache disappears on the provider's side
+    client.caches.clear()
+    streamed = await turn(llm, "session", 1)
+    await asyncio.sleep(0.2)
+    await turn(llm, "session", 2)
+    await asyncio.sleep(0.05)
+    final = await turn(llm, "session", 3, stream=False)
+    return (
+        streamed["response"] == e2e.ANSWER
+        and final["response"] == e2e.ANSWER
+        and client.creates == 2
+        and client.requests[-1] is not None
+    )
+
+
+async def main() -> bool:
+    ok = True
+    for check in (
+        reused_across_turns,
+        refreshed_before_expiry,
+        inline_when_uncacheable,
+        retried_inline_when_rejected,
+    ):
+        passed = await check()
+        ok = ok and passed
+        print(f"{'PASS' if passed else 'FAIL'} {check.__name__}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
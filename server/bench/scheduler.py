@@ -0,0 +1,133 @@
+"""Checks the turn scheduler's fairness, limits and load shedding, offline.
+
+Drives TurnScheduler directly with simulated provider calls: a session that
+bursts requests must not delay the others, weights must set each session's
+share, per-session and global limits must hold, cancelled waiters must give up
+their place and new turns must be turned away once the queue is full. Reports
+how long the light sessions waited behind the burst.
+
+    python bench/scheduler.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config  # noqa: E402
+from scheduler import FairLimiter, SchedulerBusy, TurnScheduler  # noqa: E402
+
+CALL_SECONDS = 0.01
+
+
+async def call(limiter: FairLimiter, key: str, order: list, weight: float = 1.0) -> float:
+    """Simulated provider call; returns how long it waited for a slot."""
+    queued = time.perf_counter()
+    async with limiter.slot(key, weight):
+        waited = time.perf_counter() - queued
+        order.append(key)
+        await asyncio.sleep(CALL_SECONDS)
+    return waited
+
+
+async def burst_does_not_starve() -> bool:
+    limiter = FairLimiter("llm", 2, 1)
+    order = []
+    burst = [asyncio.create_task(call(limiter, "burst", order)) for _ in range(20)]
+    await asyncio.sleep(0)
+    light = [
+        asyncio.create_task(call(limiter, f"light-{i}", order)) for i in range(4)
+    ]
+    waits = await asyncio.gather(*light)
+    await asyncio.gather(*burst)
+    # Every light session should run within the first few slots handed out
+    served = max(order.index(f"light-{i}") for i in range(4))
+    print(
+        f"  light sessions waited {statistics.median(waits) * 1000:.1f}ms median "
+        f"behind a 20 request burst, all served by slot {served + 1}"
+    )
+    return served < 8
+
+
+async def weighted_share() -> bool:
+    limiter = FairLimiter("llm", 1, 1)
+    order = []
+    await asyncio.gather(
+        *(call(limiter, "heavy", order, weight=2.0) for _ in range(12)),
+        *(call(limiter, "light", order, weight=1.0) for _ in range(12)),
+    )
+    first = order[:12]
+    print(f"  first 12 slots: {first.count('heavy')} heavy, {first.count('light')} light")
+    return first.count("heavy") == 8
+
+
+async def limits_hold() -> bool:
+    limiter = FairLimiter("tts", 3, 1)
+    peak = {"total": 0, "session": 0}
+
+    async def tracked(key: str) -> None:
+        async with limiter.slot(key):
+            peak["total"] = max(peak["total"], limiter.running)
+            peak["session"] = max(peak["session"], limiter._running_by_key[key])
+            await asyncio.sleep(CALL_SECONDS)
+
+    await asyncio.gather(*(tracked(f"s{i % 5}") for i in range(30)))
+    return peak["total"] == 3 and peak["session"] == 1 and limiter.stats() == {
+        "running": 0,
+        "queued": 0,
+        "sessions": 0,
+    }
+
+
+async def cancelled_waiters_leave() -> bool:
+    limiter = FairLimiter("llm", 1, 1)
+    order = []
+    tasks = [asyncio.create_task(call(limiter, f"s{i}", order)) for i in range(4)]
+    await asyncio.sleep(0)
+    tasks[1].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return order == ["s0", "s2", "s3"] and limiter.stats()["sessions"] == 0
+
+
+async def sheds_when_full() -> bool:
+    config.update(turn_queue_max=4, turn_queue_session_max=2)
+    scheduler = TurnScheduler()
+    scheduler.limiters["llm"].concurrency = 1
+
+    async def turn(key: str) -> bool:
+        try:
+            scheduler.admit(key)
+        except SchedulerBusy:
+            return False
+        async with scheduler.slot("llm", key):
+            await asyncio.sleep(CALL_SECONDS)
+        return True
+
+    # One running and four queued get in, the rest are turned away
+    admitted = await asyncio.gather(*(turn(f"s{i}") for i in range(8)))
+    # A single session can't fill the queue on its own
+    same = await asyncio.gather(*(turn("tab") for _ in range(5)))
+    print(f"  admitted {sum(admitted)}/8 across sessions, {sum(same)}/5 from one session")
+    return sum(admitted) == 5 and sum(same) == 3 and scheduler.rejected == 5
+
+
+async def main() -> bool:
+    ok = True
+    for check in (
+        burst_does_not_starve,
+        weighted_share,
+        limits_hold,
+        cancelled_waiters_leave,
+        sheds_when_full,
+    ):
+        passed = await check()
+        ok = ok and passed
+        print(f"{'PASS' if passed else 'FAIL'} {check.__name__}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,87 @@
+"""First-chunk and total synthesis latency per TTS provider.
+
+Runs the same utterances through each provider, one at a time and then
+with --concurrency in flight, so providers can be compared on time to first
+audio. The local provider needs no network; cartesia needs CARTESIA_API_KEY.
+
+    python bench/tts_latency.py --providers local,cartesia --utterances 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dotenv import load_dotenv  # noqa: E402
+from config import config  # noqa: E402
+from tts import create_tts, negotiate_output_format  # noqa: E402
+
+SENTENCES = [
+    "Hello there!",
+    "Sure, here is a short answer to your question.",
+    "That depends on a few things, so let me walk you through them one at a time.",
+]
+
+
+async def timed_utterance(tts, text, output_format):
+    start = time.perf_counter()
+    first_chunk = None
+    audio_bytes = 0
+    async for chunk in tts.synthesize(text, output_format):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        audio_bytes += len(chunk)
+    return first_chunk, time.perf_counter() - start, audio_bytes
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def measure(provider, args):
+    tts = create_tts(provider)
+    _, output_format = negotiate_output_format([args.format], tts.supported_encodings)
+    texts = [SENTENCES[i % len(SENTENCES)] for i in range(args.utterances)]
+    try:
+        # Warm up the connection so it isn't counted against the first utterance
+        await timed_utterance(tts, SENTENCES[0], output_format)
+        results = []
+        for start in range(0, len(texts), args.concurrency):
+            batch = texts[start : start + args.concurrency]
+            results += await asyncio.gather(
+                *(timed_utterance(tts, text, output_format) for text in batch)
+            )
+    finally:
+        await tts.close()
+    first_chunks = [r[0] * 1000 for r in results if r[0] is not None]
+    totals = [r[1] * 1000 for r in results]
+    return {
+        "first_chunk_p50_ms": statistics.median(first_chunks),
+        "first_chunk_p95_ms": percentile(first_chunks, 0.95),
+        "total_p50_ms": statistics.median(totals),
+        "audio_bytes": sum(r[2] for r in results),
+    }
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--providers", default="local")
+    parser.add_argument("--utterances", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--format", default=config["tts_output_format"])
+    args = parser.parse_args()
+
+    for provider in args.providers.split(","):
+        result = asyncio.run(measure(provider, args))
+        print(
+            f"{provider:10} first_chunk p50={result['first_chunk_p50_ms']:7.1f}ms "
+            f"p95={result['first_chunk_p95_ms']:7.1f}ms "
+            f"total p50={result['total_p50_ms']:7.1f}ms "
+            f"audio={result['audio_bytes'] / 1024:8.1f}KiB"
+        )
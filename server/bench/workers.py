@@ -0,0 +1,198 @@
+"""Throughput as the number of server workers grows.
+
+Each worker is a separate process running the app with the offline providers
+from e2e.py, all sharing one Redis. The load is open loop: sessions arrive at
+random at a fixed rate, whether or not earlier turns have finished, and each
+runs its turns back to back. Offer more turns per second than one worker can
+serve and completed turns/s shows how far more workers take it; turns a worker
+can't take are counted as rejected.
+
+Like a load balancer without sticky sessions, every turn reconnects to the
+next worker, so sessions keep moving between workers and only carry on if their
+state is in Redis. At the end every session's transcript is checked for all of
+the turns it completed.
+
+Needs a Redis all workers can reach: REDIS_HOST/REDIS_PORT (a scratch
+database, it is flushed), or --fake for an in-process fakeredis TCP server,
+which comes with the bench extra.
+
+    python bench/workers.py --workers 1,2,4 --rate 200 --duration 10 --fake
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import e2e  # noqa: E402
+import redis  # noqa: E402
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+
+
+def serve_worker(port: int, args) -> None:
+    logging.getLogger().setLevel(logging.WARNING)
+    e2e.install_fakes(args, fake_redis=False)
+    uvicorn.run(e2e.main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def run_client(urls: list, args, frames: list, samples: dict, seed: int) -> tuple:
+    """One session's turns; returns its id and how many turns completed."""
+    rng = random.Random(seed)
+    session_id = None
+    own = e2e.new_samples()
+    for turn in range(args.turns):
+        url = urls[seed % len(urls) if args.sticky else (seed + turn) % len(urls)]
+        try:
+            async with websockets.connect(url, max_size=None) as ws:
+                # Every socket is offered a fresh session; keep the first one
+                assigned = await e2e.session_id_from(ws)
+                session_id = session_id or assigned
+                kind = "audio" if rng.random() < args.audio_ratio else "text"
+                await e2e.run_turn(ws, session_id, turn, kind, args, frames, own)
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+            # An overloaded worker; the session gives up like a user would
+            own["errors"] += 1
+            break
+        await asyncio.sleep(args.think_ms / 1000)
+    for name, value in own.items():
+        samples[name] += value
+    return session_id, own["text_turns"] + own["audio_turns"]
+
+
+async def drive(urls: list, args) -> tuple:
+    """Start sessions at random (Poisson) times for the duration, so turns are
+    offered at args.rate per second on average, then wait for all of them."""
+    frames = e2e.speech_pcm(args.speech_ms, 300)
+    samples = e2e.new_samples()
+    rng = random.Random(0)
+    session_rate = args.rate / args.turns
+    clients = []
+    start = time.perf_counter()
+    arrival = start
+    while arrival - start < args.duration:
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        clients.append(
+            asyncio.create_task(run_client(urls, args, frames, samples, len(clients)))
+        )
+        arrival += rng.expovariate(session_rate)
+    sessions = await asyncio.gather(*clients)
+    return samples, time.perf_counter() - start, sessions
+
+
+def measure(workers: int, args, store: redis.Redis) -> dict:
+    store.flushdb()
+    ports = [free_port() for _ in range(workers)]
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=serve_worker, args=(port, args)) for port in ports]
+    for process in processes:
+        process.start()
+    try:
+        for port in ports:
+            wait_for_port(port)
+        urls = [f"ws://127.0.0.1:{port}/connect?input_format=pcm_s16le_16000" for port in ports]
+        samples, elapsed, sessions = asyncio.run(drive(urls, args))
+        # Let the last background saves land
+        time.sleep(0.5)
+        intact = sum(store.llen(f"session:{sid}") == turns for sid, turns in sessions)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    return {
+        "workers": workers,
+        **e2e.summarize(samples, elapsed),
+        "sessions": len(sessions),
+        "sessions_intact": intact,
+    }
+
+
+def start_fake_redis() -> int:
+    from fakeredis import TcpFakeServer
+
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    # Don't let open client connections keep the bench alive at exit
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--rate", type=float, default=200, help="turns offered per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of arrivals")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--sticky", action="store_true", help="keep each client on one worker")
+    parser.add_argument("--fake", action="store_true", help="use an in-process fakeredis server")
+    parser.add_argument("--audio-ratio", type=float, default=0.5)
+    parser.add_argument("--speech-ms", type=int, default=1000)
+    parser.add_argument("--realtime-audio", action="store_true")
+    parser.add_argument("--think-ms", type=int, default=0)
+    parser.add_argument("--llm-first-token-ms", type=int, default=300)
+    parser.add_argument("--llm-chunk-ms", type=int, default=20)
+    parser.add_argument("--tts-first-chunk-ms", type=int, default=100)
+    parser.add_argument("--tts-speedup", type=float, default=4)
+    parser.add_argument("--turn-timeout", type=float, default=30)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.fake:
+        # Spawned workers inherit the environment, so they all find this server
+        os.environ["REDIS_HOST"] = "127.0.0.1"
+        os.environ["REDIS_PORT"] = str(start_fake_redis())
+        os.environ["REDIS_USERNAME"] = ""
+        os.environ["REDIS_PASSWORD"] = ""
+    store = redis.Redis(
+        host=os.getenv("REDIS_HOST", ""),
+        port=int(os.getenv("REDIS_PORT", "")),
+        username=os.getenv("REDIS_USERNAME", ""),
+        password=os.getenv("REDIS_PASSWORD", ""),
+        decode_responses=True,
+    )
+
+    results = []
+    for workers in (int(n) for n in args.workers.split(",")):
+        result = measure(workers, args, store)
+        results.append(result)
+        print(
+            f"workers={workers:2} {result['throughput_turns_per_s']:7.2f} turns/s "
+            f"({result['throughput_turns_per_s'] / workers:6.2f} per worker, "
+            f"{args.rate:g} offered) "
+            f"turn p50={result['turn_latency_p50_ms']:7.1f}ms "
+            f"p95={result['turn_latency_p95_ms']:7.1f}ms "
+            f"rejected={result['rejected']} errors={result['errors']} "
+            f"sessions intact={result['sessions_intact']}/{result['sessions']}"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
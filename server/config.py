@@ -1,11 +1,148 @@
-from constants import voice_embedding
-
 config = {
-    "tts_chunking_limit": 15,
-    "voice_embedding": voice_embedding,
+    # DEBUG adds a line per message received (types only, never payloads)
+    "log_level": "INFO",
+    # audio is sent to the frontend in frames of this many ms; while the socket is
+    # slow to drain, frames grow up to tts_max_frame_ms instead of queueing up
+    "tts_frame_ms": 250,
+    "tts_max_frame_ms": 1000,
+    "tts_send_queue_frames": 4,
+    # embedding in voices/<voice>.f32; clients can pick another one in voices_dir
+    # with ?voice= on /connect
+    "voice": "default",
+    "voices_dir": "voices",
     "model_id": "sonic-2",
-    # cartesia output, will create a separate tts class
-    # "container": "raw",
-    # "encoding": "pcm_f32le",
-    # "sample_rate": 22050
+    # "cartesia", or "local" for an offline tone generator used in load tests
+    "tts_provider": "cartesia",
+    "local_tts_first_chunk_ms": 100,
+    "local_tts_speedup": 4,
+    # default for new sessions; clients can toggle it with set_tts
+    "tts_enabled": True,
+    # synthesized audio cache; tts_cache_dir enables the on-disk tier
+    "tts_cache_max_bytes": 32 * 1024 * 1024,
+    "tts_cache_max_entry_bytes": 2 * 1024 * 1024,
+    "tts_cache_chunk_bytes": 8 * 1024,
+    "tts_cache_dir": "",
+    "tts_cache_disk_max_bytes": 512 * 1024 * 1024,
+    "redis_max_connections": 64,
+    # seconds to wait for a free pooled Redis connection
+    "redis_pool_timeout": 5,
+    # pub/sub channel workers use to signal each other (kill_streaming, stale
+    # cached context); "" turns it off for single worker deployments
+    "session_bus_channel": "voice_agent:sessions",
+    "session_bus_retry_seconds": 1,
+    # sessions idle this long have their transcript and context moved into one
+    # compressed blob, read back transparently; archived sessions are deleted
+    # after archive_ttl_seconds unless they become active again (0 keeps them)
+    "archive_enabled": True,
+    "archive_idle_seconds": 24 * 60 * 60,
+    "archive_ttl_seconds": 180 * 24 * 60 * 60,
+    "archive_interval_seconds": 60 * 60,
+    "archive_batch_size": 200,
+    # "zlib", or "zstd" with the zstandard package installed
+    "archive_codec": "zlib",
+    "archive_compression_level": 6,
+    # inflated archives kept per worker, so paging through one inflates it once
+    "archive_cache_max_entries": 100,
+    # sidebar titles are the first query, cut to this length
+    "session_title_max_chars": 60,
+    "session_page_size": 50,
+    "transcript_page_size": 50,
+    # turns share the providers fairly between sessions: at most this many LLM
+    # requests and TTS streams run at once, in total and per session, the rest
+    # queue; keep the totals within the provider plans' concurrency limits
+    "llm_concurrency": 64,
+    "llm_session_concurrency": 1,
+    "tts_concurrency": 64,
+    "tts_session_concurrency": 1,
+    # relative share of the providers by turn type while sessions compete
+    "turn_weights": {"audio": 2, "text": 1},
+    # new turns get a busy message instead of queueing once this many turns wait
+    # for the LLM, overall or for one session
+    "turn_queue_max": 64,
+    "turn_queue_session_max": 2,
+    "busy_retry_after_ms": 2000,
+    # seconds before an in-flight LLM request is abandoned
+    "llm_timeout": 30,
+    # whole responses to text queries, reused when the same question comes up in
+    # the same conversation state; llm_cache_shared adds a Redis tier for all workers
+    "llm_cache_enabled": True,
+    "llm_cache_max_entries": 1000,
+    "llm_cache_max_bytes": 8 * 1024 * 1024,
+    "llm_cache_ttl_seconds": 60 * 60,
+    "llm_cache_shared": False,
+    "llm_cache_redis_prefix": "llm_cache:",
+    # keep the system instruction and prompt prefix in a Gemini cached content
+    # instead of resending them every turn; refreshed this long before expiry.
+    # Off by default: caching needs a model and account that support it
+    "llm_prompt_cache": False,
+    "llm_prompt_cache_ttl_seconds": 60 * 60,
+    "llm_prompt_cache_refresh_seconds": 5 * 60,
+    # wait before trying again when the model or account can't cache
+    "llm_prompt_cache_retry_seconds": 10 * 60,
+    # stream LLM output sentence by sentence into TTS instead of waiting for the full reply
+    "stream_responses": True,
+    "tts_min_sentence_chars": 20,
+    # speech recognition while the user talks: "gemini", "local" (offline
+    # stand-in) or "" to leave it to the LLM along with the answer
+    "stt_provider": "gemini",
+    "stt_model": "gemini-2.0-flash",
+    "stt_interval_ms": 700,
+    # raw PCM a client can send instead of recorder chunks, declared with
+    # ?input_format= on /connect; only PCM input gets VAD and silence trimming
+    "audio_input_formats": {
+        "pcm_s16le_16000": {"encoding": "pcm_s16le", "sample_rate": 16000},
+    },
+    "vad_frame_ms": 30,
+    # RMS of 16-bit samples above which a frame counts as speech
+    "vad_energy_threshold": 500,
+    "vad_min_speech_ms": 90,
+    # silence after speech that ends the turn without waiting for the final frame
+    "vad_end_silence_ms": 800,
+    # kept either side of the speech when trimming
+    "vad_padding_ms": 200,
+    # end the turn if chunks stop arriving without a final frame
+    "audio_idle_timeout_ms": 3000,
+    "max_utterance_bytes": 4 * 1024 * 1024,
+    # user audio up to this size is sent inline with the prompt, larger clips are uploaded
+    "inline_audio_max_bytes": 4 * 1024 * 1024,
+    "audio_mime_type": "audio/mp3",
+    # set to a directory to keep a copy of user audio on disk, e.g. for debugging
+    "media_dir": "",
+    "media_retention_seconds": 24 * 60 * 60,
+    "media_max_files": 500,
+    # in-memory LLM context per session, read through from and written back to Redis
+    "context_cache_max_entries": 10000,
+    "context_cache_max_bytes": 64 * 1024 * 1024,
+    "context_cache_ttl_seconds": 60 * 60,
+    # once a session's context passes the budget, all but the most recent turn
+    # summaries are condensed in the background; the hard limit caps every prompt
+    "context_budget_chars": 4000,
+    "context_keep_recent_turns": 4,
+    "context_summary_max_chars": 1000,
+    "context_hard_limit_chars": 8000,
+    # raw formats the Cartesia websocket can stream; clients list the ones they
+    # accept in preference order with ?formats= on /connect
+    "tts_output_formats": {
+        "pcm_s16le_44100": {
+            "container": "raw",
+            "encoding": "pcm_s16le",
+            "sample_rate": 44100,
+        },
+        "pcm_s16le_24000": {
+            "container": "raw",
+            "encoding": "pcm_s16le",
+            "sample_rate": 24000,
+        },
+        "pcm_s16le_16000": {
+            "container": "raw",
+            "encoding": "pcm_s16le",
+            "sample_rate": 16000,
+        },
+        "pcm_mulaw_8000": {
+            "container": "raw",
+            "encoding": "pcm_mulaw",
+            "sample_rate": 8000,
+        },
+    },
+    "tts_output_format": "pcm_s16le_44100",
 }
\ No newline at end of file
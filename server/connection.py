@@ -1,45 +1,84 @@
-from cartesia import Cartesia
-from db_manager import DBManager
-from llm import GeminiLLM
-import os
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from contextlib import aclosing
 from fastapi import WebSocket
 from config import config
-from dotenv import load_dotenv
+from text_stream import SentenceSplitter
+from tts import AudioWriter, negotiate_output_format
+from audio import AudioBuffer, pcm_to_wav
+from llm import AsyncLLM, AudioInput
+from scheduler import SchedulerBusy
+from stt import STT, STTStream
+from vad import Endpointer
+from voices import list_voices, load_voice
+import asyncio
+import metrics
+import time
 import uuid
 import base64
 import logging
 
-load_dotenv()
+if TYPE_CHECKING:
+    from session_manager import ClientPool
+
+# Binary audio frames start with a flag byte followed by the 16-byte session uuid
+AUDIO_FRAME_FINAL = 0x01
+AUDIO_FRAME_HEADER_SIZE = 17
 
 
 class Connection:
-    """High-level class that manages Cartesia, LLMs, Redis, and frontend WebSocket connection."""
+    """Per-socket state on top of the shared Cartesia, LLM and Redis clients.
+    Anything that must outlive the socket (transcripts, context, turn counters)
+    is in Redis, so a client that reconnects to another worker carries on."""
 
-    def __init__(self):
+    def __init__(self, pool: "ClientPool"):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.frontend_ws = None
         self.is_connected = False
 
-        self.cartesia = Cartesia(api_key=os.getenv("CARTESIA_API_KEY", ""))
-        self.tts_ws = self.cartesia.tts.websocket()
-        self.model_id = config["model_id"]
-        self.voice_embedding = config["voice_embedding"]
-        self.tts_chunking_limit = config["tts_chunking_limit"]
-
-        self.llm = GeminiLLM()
-
-        self.db = DBManager()
-
-        self.audio_buffer = bytearray()
-        # ID to count map to keep track of each audio message
-        self.user_identifier_map = {}
-        self.kill_streaming = {}
+        self.pool = pool
+        # Text-only sessions never touch the TTS client, which the pool builds lazily
+        self.tts_enabled = config["tts_enabled"]
+        self.output_format_name, self.output_format = negotiate_output_format([])
+        # None speaks with the provider's configured voice
+        self.voice_embedding: Optional[List[float]] = None
+        self.stream_responses = config["stream_responses"]
+        self.session_page_size = config["session_page_size"]
+        self.transcript_page_size = config["transcript_page_size"]
+
+        self.db = pool.db
+        self.context_cache = pool.context_cache
+
+        self.audio_buffer = AudioBuffer()
+        # Transcribes the utterance being recorded, if an STT provider is configured
+        self.stt_stream: Optional[STTStream] = None
+        # Raw PCM input from the client enables VAD; recorder chunks can't be inspected
+        self.input_format: Optional[Dict] = None
+        self.endpointer: Optional[Endpointer] = None
+        self.max_utterance_bytes = config["max_utterance_bytes"]
+        self.audio_idle_timeout = config["audio_idle_timeout_ms"] / 1000
+        self.idle_timer: Optional[asyncio.TimerHandle] = None
+        self.discard_until_final = False
+        self.utterance_started = 0.0
+        self.media_store = pool.media_store
+        self.scheduler = pool.scheduler
+        self.current_turn: Optional[asyncio.Task] = None
+        # Session the current turn belongs to, for kill_streaming from other workers
+        self.turn_uuid: Optional[str] = None
+        # Share of the providers the current turn gets while sessions compete
+        self.turn_weight = 1
+
+    @property
+    def llm(self) -> AsyncLLM:
+        # Read from the pool on use, so opening a socket never waits for the SDKs
+        return self.pool.llm
+
+    @property
+    def stt(self) -> Optional[STT]:
+        return self.pool.stt
 
     async def start_new_session(self) -> None:
         user_identifier = str(uuid.uuid4())
-        print("\nStarting new session", user_identifier)
-        self.user_identifier_map[user_identifier] = 0
+        self.logger.info("Starting new session %s", user_identifier)
         await self.frontend_ws.send_json({"type": "uuid", "uuid": user_identifier})
 
     async def connect(self, websocket: WebSocket) -> None:
@@ -47,8 +86,32 @@ class Connection:
         await websocket.accept()
         self.frontend_ws = websocket
         self.is_connected = True
+        requested = websocket.query_params.get("formats", "")
+        self.output_format_name, self.output_format = negotiate_output_format(
+            (name.strip() for name in requested.split(",")),
+            self.pool.tts_class.supported_encodings,
+        )
+        self.input_format = config["audio_input_formats"].get(
+            websocket.query_params.get("input_format", "")
+        )
+        voice = websocket.query_params.get("voice")
+        if voice and voice in list_voices():
+            self.voice_embedding = load_voice(voice)
         await self.start_new_session()
 
+    def disconnect(self) -> None:
+        """Drop per-session state; the shared clients stay with the pool."""
+        self.is_connected = False
+        if self.current_turn and not self.current_turn.done():
+            self.current_turn.cancel()
+        self.frontend_ws = None
+        self.audio_buffer.clear()
+        self.endpointer = None
+        self._cancel_idle_timer()
+        if self.stt_stream:
+            self.stt_stream.close()
+            self.stt_stream = None
+
     async def handle_message(self, message: Dict[str, Any]) -> None:
         """Handle incoming messages."""
         if not self.is_connected:
@@ -57,23 +120,68 @@ class Connection:
         message_type = message.get("type")
         current_uuid = message.get("uuid")
 
-        print(f"\n\ndebug> got message {message_type=}\n {message=}")
+        # Never log the message itself, it may carry a whole utterance of audio
+        self.logger.debug("Received %s for %s", message_type, current_uuid)
 
         match message_type:
             case "new_session":
                 await self.start_new_session()
 
             case "get_sessions":
-                sessions = self.db.list_sessions()
+                sessions = await self.db.list_sessions(
+                    message.get("offset", 0), message.get("limit")
+                )
                 await self.frontend_ws.send_json(
                     {"type": "sessions", "sessions": sessions}
                 )
 
+            case "get_session_page":
+                # Sidebar listing with titles, never touching transcripts
+                offset = message.get("offset", 0)
+                limit = message.get("limit") or self.session_page_size
+                session_ids = await self.db.list_sessions(offset, limit)
+                sessions = await self.db.fetch_session_meta(session_ids)
+                await self.frontend_ws.send_json(
+                    {
+                        "type": "session_page",
+                        "sessions": sessions,
+                        "offset": offset,
+                        "next_offset": (
+                            offset + len(session_ids)
+                            if len(session_ids) == limit
+                            else None
+                        ),
+                    }
+                )
+
+            case "get_transcript_page":
+                # Latest items first; pass back "before" to load older ones
+                session_id = message.get("id")
+                page = await self.db.fetch_transcript_page(
+                    session_id,
+                    message.get("before"),
+                    message.get("limit") or self.transcript_page_size,
+                )
+                page = page or {"items": [], "start": 0, "total": 0}
+                await self.frontend_ws.send_json(
+                    {
+                        "type": "transcript_page",
+                        "session_id": session_id,
+                        "items": page["items"],
+                        "start": page["start"],
+                        "total": page["total"],
+                        "next_before": page["start"] or None,
+                    }
+                )
+
             case "get_transcripts":
                 session_id = message.get("id")
-                transcript = self.db.fetch_transcript(session_id)
-                context = self.db.get_context(session_id)
-                print(f"\nData fetched: {context=} {transcript=}")
+                transcript = await self.db.fetch_transcript(session_id)
+                self.logger.debug(
+                    "Fetched %d transcript items for %s",
+                    len(transcript or []),
+                    session_id,
+                )
                 await self.frontend_ws.send_json(
                     {
                         "type": "transcripts",
@@ -83,73 +191,62 @@ class Connection:
                 )
 
             case "kill_streaming":
-                self.kill_streaming[current_uuid] = True
+                await self.cancel_turn()
+                # The turn may be running on another worker, e.g. after a reconnect
+                self.pool.spawn(self.pool.bus.publish("kill_streaming", current_uuid))
+
+            case "set_tts":
+                self.tts_enabled = bool(message.get("value"))
+                if not self.tts_enabled:
+                    # Switching audio off also stops the answer being spoken right now
+                    await self.cancel_turn()
+                await self.frontend_ws.send_json(
+                    {"type": "tts_mode", "enabled": self.tts_enabled}
+                )
 
             case "delete_session":
                 session_id = message.get("id")
-                if self.db.delete_session(session_id):
+                self.context_cache.invalidate(session_id)
+                if await self.db.delete_session(session_id):
+                    self.pool.spawn(self.context_cache.publish_change(session_id))
                     await self.frontend_ws.send_json(
                         {"type": "session_deleted", "id": session_id}
                     )
 
-            case "text" | "audio":
-                self._increment_uuid_counter(current_uuid)
+            case "text":
                 text = message.get("text", "")
-                file_name = ""
-                if message_type == "audio":
-                    count = self.user_identifier_map[current_uuid]
-                    file_name = f"media/{count}-{current_uuid}.mp3"
-                    audio_data = message.get("audio")
-
-                    if audio_data:
-                        base64_data = (
-                            audio_data.split("base64,")[1]
-                            if "base64," in audio_data
-                            else audio_data
-                        )
-                        decoded_audio = base64.b64decode(base64_data)
-                        self.audio_buffer.extend(decoded_audio)
-
-                    got_final_audio = message.get("final", False)
-                    if got_final_audio:
-                        print("Got final, writing to file:", file_name)
-                        with open(file_name, "wb") as f:
-                            f.write(bytes(self.audio_buffer))
-                        self.audio_buffer.clear()
-
-                if text or got_final_audio:
-                    resp = self.llm.generate_response(
+                if text:
+                    # A new utterance barges in on whatever is still in flight
+                    await self.cancel_turn()
+                    if self.media_store.enabled:
+                        # Keeps media file numbers in step with the transcript
+                        self.pool.spawn(self.db.next_turn_number(current_uuid))
+                    self.start_turn(
                         current_uuid,
+                        message_type,
                         text,
-                        file_name,
+                        None,
+                        message.get("stream", self.stream_responses),
                     )
 
-                    if message_type == "text":
-                        await self.frontend_ws.send_json(
-                            {
-                                "type": "transcript_item",
-                                "response": resp["response"],
-                                "context": resp["context"],
-                            }
-                        )
-                    else:
-                        await self.frontend_ws.send_json(
-                            {
-                                "type": "transcript_item",
-                                "transcript_item": resp,
-                                "context": resp["context"],
-                            }
-                        )
-
-                    await self.stream_as_audio_response(current_uuid, resp["response"])
-
-                    self.db.append_transcript(
-                        current_uuid,
-                        {"query": resp["query"], "response": resp["response"]},
+            case "audio":
+                # Legacy path: base64 chunks inside JSON, see handle_audio_frame
+                chunk = b""
+                audio_data = message.get("audio")
+                if audio_data:
+                    base64_data = (
+                        audio_data.split("base64,")[1]
+                        if "base64," in audio_data
+                        else audio_data
                     )
-
-                    if resp["context"]:
-                        self.db.update_context(current_uuid, resp["context"])
+                    with metrics.span("decode"):
+                        chunk = base64.b64decode(base64_data)
+                await self.ingest_audio(
+                    current_uuid,
+                    chunk,
+                    message.get("final", False),
+                    message.get("stream", self.stream_responses),
+                )
 
             case _:
                 await self.frontend_ws.send_json(
@@ -159,73 +256,427 @@ class Connection:
                     }
                 )
 
-    async def stream_as_audio_response(self, current_uuid: str, text: str) -> None:
-        """Process text-to-speech conversion and stream to frontend."""
+    async def handle_audio_frame(self, frame: bytes) -> None:
+        """Handle a binary push-to-talk frame.
+
+        Layout: 1 flag byte (bit 0 = final), the 16 raw bytes of the session
+        uuid, then the audio payload, which may be empty on the final frame.
+        """
+        if not self.is_connected:
+            raise RuntimeError("No active connection with frontend")
+        if len(frame) < AUDIO_FRAME_HEADER_SIZE:
+            await self.frontend_ws.send_json(
+                {"type": "error", "message": "Malformed audio frame"}
+            )
+            return
+
+        view = memoryview(frame)
+        current_uuid = str(uuid.UUID(bytes=bytes(view[1:AUDIO_FRAME_HEADER_SIZE])))
+        await self.ingest_audio(
+            current_uuid,
+            view[AUDIO_FRAME_HEADER_SIZE:],
+            bool(frame[0] & AUDIO_FRAME_FINAL),
+            self.stream_responses,
+        )
+
+    async def ingest_audio(
+        self, current_uuid: str, chunk: bytes, final: bool, stream: bool
+    ) -> None:
+        """Buffer one push-to-talk chunk and start the turn once the utterance ends:
+        on the final frame, after trailing silence (PCM input), when the size cap
+        is reached, or when chunks stop arriving without a final frame."""
+        if self.discard_until_final:
+            # The turn already started without the client's final frame
+            self.discard_until_final = not final
+            return
+        if self.input_format and self.endpointer is None:
+            self.endpointer = Endpointer(self.input_format["sample_rate"])
+        if chunk and not self.audio_buffer and not self.endpointer:
+            # A new utterance barges in on whatever is still in flight. An empty
+            # final frame isn't one: it may just be late for an utterance the
+            # idle timer already ended
+            await self.cancel_turn()
+        if chunk:
+            if not self.audio_buffer:
+                self.utterance_started = time.perf_counter()
+            metrics.AUDIO_RECEIVED_BYTES.inc(len(chunk))
+            if self.stt and self.stt_stream is None:
+                self.stt_stream = self.stt.open_stream(
+                    self.send_partial_transcript, self.input_format
+                )
+            self.audio_buffer.append(chunk)
+            if self.stt_stream:
+                await self.stt_stream.feed(chunk)
+            if self.endpointer:
+                was_speaking = self.endpointer.speech_started
+                final = self.endpointer.feed(chunk) or final
+                if self.endpointer.speech_started and not was_speaking:
+                    # With VAD, barge in on actual speech rather than the first chunk
+                    await self.cancel_turn()
+            if not final and len(self.audio_buffer) >= self.max_utterance_bytes:
+                self.logger.warning("Utterance hit the size cap, ending the turn")
+                final = True
+                # VAD starts the next utterance on its own; recorder chunks of the
+                # same press would not decode without the ones already used
+                self.discard_until_final = self.endpointer is None
+            self._restart_idle_timer(current_uuid, stream)
+        if not final:
+            return
+
+        self._cancel_idle_timer()
+        if self.audio_buffer:
+            metrics.observe("receive", time.perf_counter() - self.utterance_started)
+        endpointer, self.endpointer = self.endpointer, None
+        stt_stream, self.stt_stream = self.stt_stream, None
+        audio = self.audio_buffer.take() if self.audio_buffer else b""
+        if endpointer:
+            # Silence costs upload time and audio tokens without adding anything
+            audio = endpointer.trim(audio)
+            if audio:
+                audio = pcm_to_wav(audio, self.input_format["sample_rate"])
+        if not audio:
+            if stt_stream:
+                stt_stream.close()
+            return
+
+        if self.media_store.enabled:
+            count = await self.db.next_turn_number(current_uuid)
+            extension = "wav" if endpointer else "mp3"
+            self.media_store.save(f"{count}-{current_uuid}.{extension}", audio)
+        self.start_turn(current_uuid, "audio", "", audio, stream, stt_stream)
+
+    def _restart_idle_timer(self, current_uuid: str, stream: bool) -> None:
+        self._cancel_idle_timer()
+        self.idle_timer = asyncio.get_running_loop().call_later(
+            self.audio_idle_timeout,
+            lambda: self.pool.spawn(self._end_idle_utterance(current_uuid, stream)),
+        )
+
+    def _cancel_idle_timer(self) -> None:
+        if self.idle_timer:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+
+    async def _end_idle_utterance(self, current_uuid: str, stream: bool) -> None:
+        """Chunks stopped without a final frame, e.g. the network dropped it."""
+        self.idle_timer = None
+        if not self.is_connected or not self.audio_buffer:
+            return
+        self.logger.warning("No audio for %ss, ending the turn", self.audio_idle_timeout)
+        await self.ingest_audio(current_uuid, b"", True, stream)
+
+    def start_turn(
+        self,
+        current_uuid: str,
+        message_type: str,
+        text: str,
+        audio: AudioInput,
+        stream: bool,
+        stt_stream: Optional[STTStream] = None,
+    ) -> None:
+        # Run the turn in the background so kill_streaming and the next
+        # utterance are read while it is still generating
+        self.turn_uuid = current_uuid
+        self.turn_weight = config["turn_weights"].get(message_type, 1)
+        self.current_turn = asyncio.create_task(
+            self.run_turn(current_uuid, message_type, text, audio, stream, stt_stream)
+        )
+
+    async def cancel_turn(self) -> None:
+        """Cancel the in-flight turn and wait for it to record what it produced."""
+        turn = self.current_turn
+        if turn is None or turn.done():
+            return
+        turn.cancel()
         try:
-            buffer = bytearray()
-            chunk_count = 0
+            await turn
+        except asyncio.CancelledError:
+            pass
+
+    async def run_turn(
+        self,
+        current_uuid: str,
+        message_type: str,
+        text: str,
+        audio: AudioInput,
+        stream: bool,
+        stt_stream: Optional[STTStream] = None,
+    ) -> None:
+        """STT, LLM, TTS and persistence for one user utterance, as a cancellable unit."""
+        # Filled in as the turn progresses so an interruption can record it
+        partial = {"query": text, "response": "", "context": "", "complete": False}
+        metrics.start_turn()
+        try:
+            self.scheduler.admit(current_uuid)
+        except SchedulerBusy:
+            if stt_stream:
+                stt_stream.close()
+            metrics.TURNS.labels(message_type, "rejected").inc()
+            await self._send_if_connected(
+                {
+                    "type": "busy",
+                    "message": "The server is busy, please try again shortly",
+                    "input_type": message_type,
+                    "retry_after_ms": config["busy_retry_after_ms"],
+                }
+            )
+            return
+        try:
+            if stt_stream:
+                with metrics.span("stt_final"):
+                    text, audio = await self.finish_transcript(stt_stream, audio)
+                partial["query"] = text
+            if stream:
+                resp = await self.stream_response(
+                    current_uuid, message_type, text, audio, partial
+                )
+            else:
+                async with self.scheduler.slot("llm", current_uuid, self.turn_weight):
+                    resp = await self.llm.agenerate_response(
+                        current_uuid,
+                        text,
+                        audio,
+                    )
+                partial.update(resp, complete=True)
+                metrics.mark("llm_complete")
+                await self.send_transcript_item(message_type, resp)
+                if self.tts_enabled:
+                    await self.stream_as_audio_response(
+                        current_uuid, resp["response"]
+                    )
+
+            self.persist_turn(current_uuid, resp)
+            metrics.mark("complete")
+            metrics.TURNS.labels(message_type, "complete").inc()
+        except asyncio.CancelledError:
+            metrics.TURNS.labels(message_type, "interrupted").inc()
+            await self._record_interrupted_turn(current_uuid, message_type, partial)
+            raise
+        except Exception as e:
+            metrics.TURNS.labels(message_type, "error").inc()
+            self.logger.error("Turn failed: %s", str(e))
+            await self._send_if_connected(
+                {"type": "error", "message": f"Turn error: {str(e)}"}
+            )
+
+    async def finish_transcript(
+        self, stt_stream: STTStream, audio: AudioInput
+    ) -> Tuple[str, AudioInput]:
+        """Final transcript for the LLM, so it gets text instead of the audio.
+        If transcription fails the audio goes to the LLM as before."""
+        try:
+            text = await stt_stream.finish()
+        except asyncio.CancelledError:
+            stt_stream.close()
+            raise
+        except Exception as e:
+            self.logger.error("STT failed, sending audio to the LLM: %s", str(e))
+            return "", audio
+        if not text:
+            return "", audio
+        await self.send_partial_transcript(text, final=True)
+        return text, None
+
+    async def send_partial_transcript(self, text: str, final: bool = False) -> None:
+        await self._send_if_connected(
+            {"type": "partial_transcript", "text": text, "final": final}
+        )
+
+    def persist_turn(self, current_uuid: str, resp: dict) -> None:
+        """Save the transcript item and running context in the background, in one round-trip."""
+        self.pool.spawn(self._save_turn(current_uuid, resp))
+
+    async def _save_turn(self, current_uuid: str, resp: dict) -> None:
+        await metrics.timed(
+            "db_save_turn",
+            self.db.save_turn(
+                current_uuid,
+                {"query": resp["query"], "response": resp["response"]},
+                self.context_cache.peek(current_uuid).context or None,
+            ),
+        )
+        await self.context_cache.publish_change(current_uuid)
+
+    async def _record_interrupted_turn(
+        self, current_uuid: str, message_type: str, partial: dict
+    ) -> None:
+        await self._send_if_connected(
+            {
+                "type": "tts_stopped",
+                "message": "TTS streaming stopped on client request",
+            }
+        )
+        if not partial["complete"]:
+            if not partial["response"]:
+                # Nothing reached the user, so there is nothing to remember
+                return
+            # Remember only what was actually generated before the cut-off
+            self.llm.record_interrupted_turn(current_uuid, partial["response"])
+            partial["context"] = ""
+            if message_type == "text":
+                await self._send_if_connected(
+                    {
+                        "type": "transcript_item",
+                        "response": partial["response"],
+                        "context": "",
+                    }
+                )
+        self.persist_turn(current_uuid, partial)
 
+    async def _send_if_connected(self, message: Dict[str, Any]) -> None:
+        if not self.is_connected:
+            return
+        try:
+            await self.frontend_ws.send_json(message)
+        except Exception as e:
+            self.logger.debug("Could not notify frontend: %s", str(e))
+
+    async def send_transcript_item(self, message_type: str, resp: dict) -> None:
+        if message_type == "text":
             await self.frontend_ws.send_json(
-                {"type": "tts_start", "message": "Starting TTS processing"}
+                {
+                    "type": "transcript_item",
+                    "response": resp["response"],
+                    "context": resp["context"],
+                }
+            )
+        else:
+            await self.frontend_ws.send_json(
+                {
+                    "type": "transcript_item",
+                    "transcript_item": resp,
+                    "context": resp["context"],
+                }
             )
 
-            tts_stream = self.tts_ws.send(
-                model_id=self.model_id,
-                transcript=text,
-                voice_embedding=self.voice_embedding,
-                stream=True,
-                _experimental_voice_controls={"emotion": ["positivity:highest"]},
-                output_format={
-                    "container": "raw",
-                    "encoding": "pcm_s16le",
-                    "sample_rate": 44100,
-                },
+    async def stream_response(
+        self,
+        current_uuid: str,
+        message_type: str,
+        text: str,
+        audio: AudioInput,
+        partial: dict,
+    ) -> dict:
+        """Pipe streamed LLM text into a single TTS context sentence by sentence,
+        so audio starts after the first sentence instead of the whole answer."""
+        sentences: asyncio.Queue = asyncio.Queue()
+        splitter = SentenceSplitter()
+        resp = None
+
+        async def sentence_stream() -> AsyncIterator[str]:
+            while (sentence := await sentences.get()) is not None:
+                yield sentence
+
+        def start_player() -> asyncio.Task:
+            return asyncio.create_task(
+                self.play_audio(
+                    current_uuid,
+                    self.pool.tts.synthesize(
+                        sentence_stream(), self.output_format, self.voice_embedding
+                    ),
+                )
             )
 
-            for output in tts_stream:
-                if self.kill_streaming.get(current_uuid, False):
-                    buffer.clear()
-                    chunk_count = 0
+        player = None
+
+        try:
+            async with self.scheduler.slot(
+                "llm", current_uuid, self.turn_weight
+            ), aclosing(self.llm.astream_response(current_uuid, text, audio)) as chunks:
+                async for chunk in chunks:
+                    if isinstance(chunk, dict):
+                        resp = chunk
+                        partial.update(resp, complete=True)
+                        metrics.mark("llm_complete")
+                        break
+                    metrics.mark("llm_first_token")
+                    partial["response"] += chunk
                     await self.frontend_ws.send_json(
                         {
-                            "type": "tts_stopped",
-                            "message": "TTS streaming stopped on client request",
+                            "type": "transcript_delta",
+                            "delta": chunk,
+                            "input_type": message_type,
                         }
                     )
-                    self.kill_streaming[current_uuid] = False
-                    break
-                buffer.extend(output["audio"])
-                chunk_count += 1
-
-                # The audio and pauses sound weird without any merging
-                if chunk_count >= self.tts_chunking_limit:
-                    await self.frontend_ws.send_bytes(bytes(buffer))
-                    buffer.clear()
-                    chunk_count = 0
-
-            # Send any remaining data in the buffer
-            if buffer:
-                self.logger.debug("Sending final merged chunks")
-                await self.frontend_ws.send_bytes(bytes(buffer))
-                buffer.clear()
-                chunk_count = 0
-
+                    if self.tts_enabled:
+                        for sentence in splitter.feed(chunk):
+                            player = player or start_player()
+                            sentences.put_nowait(sentence)
+
+            tail = splitter.flush()
+            if player:
+                if tail:
+                    sentences.put_nowait(tail)
+                sentences.put_nowait(None)
+
+            await self.send_transcript_item(message_type, resp)
+            if player:
+                await player
+            elif tail:
+                # Short answers never released a sentence early, so they can be
+                # served whole from the audio cache
+                await self.play_audio(current_uuid, self.synthesize_cached(tail))
+        except Exception as e:
+            self.logger.error("Streaming response error: %s", str(e))
             await self.frontend_ws.send_json(
-                {"type": "tts_complete", "message": "TTS processing complete"}
+                {"type": "error", "message": f"TTS error: {str(e)}"}
             )
+            if resp is None:
+                resp = self.llm.fallback_response(current_uuid)
+        finally:
+            if player and not player.done():
+                player.cancel()
+                await asyncio.gather(player, return_exceptions=True)
+
+        return resp
+
+    async def play_audio(self, current_uuid: str, audio: AsyncIterator[bytes]) -> None:
+        """Send synthesized audio to the frontend in duration-based frames."""
+        async with self.scheduler.slot("tts", current_uuid, self.turn_weight):
+            await self._play_audio(audio)
+
+    async def _play_audio(self, audio: AsyncIterator[bytes]) -> None:
+        await self.frontend_ws.send_json(
+            {
+                "type": "tts_start",
+                "message": "Starting TTS processing",
+                "format": {"name": self.output_format_name, **self.output_format},
+            }
+        )
+        writer = AudioWriter(self.frontend_ws.send_bytes, self.output_format)
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            async with aclosing(audio) as chunks:
+                async for chunk in chunks:
+                    if first_chunk:
+                        metrics.observe("tts_first_chunk", time.perf_counter() - started)
+                        metrics.mark("first_audio")
+                        first_chunk = False
+                    await writer.write(chunk)
+            await writer.close()
+            metrics.observe("tts_complete", time.perf_counter() - started)
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            metrics.AUDIO_SENT_BYTES.inc(writer.bytes_sent)
+
+        await self.frontend_ws.send_json(
+            {"type": "tts_complete", "message": "TTS processing complete"}
+        )
 
+    async def stream_as_audio_response(self, current_uuid: str, text: str) -> None:
+        """Process text-to-speech conversion and stream to frontend."""
+        try:
+            await self.play_audio(current_uuid, self.synthesize_cached(text))
         except Exception as e:
             self.logger.error("Cartesia streaming error: %s", str(e))
-            self.tts_ws = self.cartesia.tts.websocket()
             await self.frontend_ws.send_json(
                 {"type": "error", "message": f"TTS error: {str(e)}"}
             )
 
-    async def process_stt(self, audio_data: bytes) -> str:
-        """Process speech-to-text conversion."""
-        pass
-
-    def _increment_uuid_counter(self, current_uuid: str):
-        if current_uuid not in self.user_identifier_map:
-            self.user_identifier_map[current_uuid] = 0
-        self.user_identifier_map[current_uuid] += 1
+    def synthesize_cached(self, text: str) -> AsyncIterator[bytes]:
+        return self.pool.tts_cache.synthesize(
+            self.pool.tts, text, self.output_format, self.voice_embedding
+        )
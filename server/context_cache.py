@@ -0,0 +1,201 @@
+from typing import Dict, Optional, TYPE_CHECKING
+from collections import OrderedDict
+from config import config
+import asyncio
+import logging
+import metrics
+import time
+
+if TYPE_CHECKING:
+    from db_manager import AbstractDBManager
+    from session_bus import SessionBus
+
+
+class SessionContext:
+    """What the LLM remembers about one session between turns."""
+
+    __slots__ = ("context", "last_response", "last_access")
+
+    def __init__(self, context: str = "", last_response: str = ""):
+        self.context = context
+        self.last_response = last_response
+        self.last_access = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return len(self.context) + len(self.last_response)
+
+
+class SessionContextCache:
+    """LRU + TTL cache of per-session LLM context with a memory cap.
+
+    Misses read through from the async database (context plus the last
+    transcript response) and updates are written back in the background.
+    With a session bus, other workers drop their copy of a session once its
+    context has been written, so a session can move between workers.
+    """
+
+    def __init__(
+        self,
+        db: Optional["AbstractDBManager"] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        bus: Optional["SessionBus"] = None,
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.db = db
+        self.max_entries = max_entries or config["context_cache_max_entries"]
+        self.max_bytes = max_bytes or config["context_cache_max_bytes"]
+        self.ttl_seconds = ttl_seconds or config["context_cache_ttl_seconds"]
+
+        self._entries: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._bytes = 0
+        self._pending_writes: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.bus = bus
+        if bus:
+            bus.subscribe("context_changed", self._invalidate_remote)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def peek(self, uuid: str) -> SessionContext:
+        """Cached entry without touching the database or the LRU order."""
+        return self._entries.get(uuid) or SessionContext()
+
+    def get(self, uuid: str) -> SessionContext:
+        """Sync lookup for callers outside the event loop; misses start empty
+        because the database client is async."""
+        entry = self._lookup(uuid)
+        if entry is None:
+            entry = self._store(uuid, SessionContext())
+        return entry
+
+    async def aget(self, uuid: str) -> SessionContext:
+        entry = self._lookup(uuid)
+        if entry is None:
+            # Don't read back a value that is still being written
+            pending = self._pending_writes.get(uuid)
+            if pending:
+                await asyncio.shield(pending)
+            entry = self._store(uuid, await self._load(uuid))
+        return entry
+
+    def update(
+        self,
+        uuid: str,
+        context: Optional[str] = None,
+        last_response: Optional[str] = None,
+        persist: bool = True,
+    ) -> SessionContext:
+        """Update a session read earlier with get/aget. Pass persist=False when the
+        caller saves the context itself, e.g. together with the turn's transcript."""
+        entry = self._entries.pop(uuid, None)
+        if entry is None:
+            entry = SessionContext()
+        else:
+            self._bytes -= entry.size
+        if context is not None:
+            entry.context = context
+        if last_response is not None:
+            entry.last_response = last_response
+        self._store(uuid, entry)
+        if context is not None and persist:
+            self._write_back(uuid, entry.context)
+        return entry
+
+    def invalidate(self, uuid: str) -> None:
+        entry = self._entries.pop(uuid, None)
+        if entry:
+            self._bytes -= entry.size
+
+    async def publish_change(self, uuid: str) -> None:
+        """Tell other workers their cached copy of a session is stale. Call after
+        the new state has been written to the database."""
+        if self.bus:
+            await self.bus.publish("context_changed", uuid)
+
+    async def _invalidate_remote(self, uuid: str) -> None:
+        self.invalidate(uuid)
+
+    def _lookup(self, uuid: str) -> Optional[SessionContext]:
+        entry = self._entries.get(uuid)
+        if entry is None or time.monotonic() - entry.last_access > self.ttl_seconds:
+            if entry is not None:
+                self.invalidate(uuid)
+                self.evictions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.last_access = time.monotonic()
+        self._entries.move_to_end(uuid)
+        return entry
+
+    async def _load(self, uuid: str) -> SessionContext:
+        if self.db is None:
+            return SessionContext()
+        context = await self.db.get_context(uuid)
+        if context is None:
+            # Caching an empty context here would overwrite the stored one on
+            # the next write-back, so fail the turn and read again next time
+            raise RuntimeError(f"Context for session {uuid} could not be read")
+        transcript = await self.db.fetch_transcript(uuid, start=-1) or []
+        last_response = transcript[-1].get("response", "") if transcript else ""
+        return SessionContext(context, last_response)
+
+    def _store(self, uuid: str, entry: SessionContext) -> SessionContext:
+        if uuid in self._entries:
+            self._bytes -= self._entries[uuid].size
+        entry.last_access = time.monotonic()
+        self._entries[uuid] = entry
+        self._entries.move_to_end(uuid)
+        self._bytes += entry.size
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        # Always keep the entry that was just stored, even if it alone exceeds the cap
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def _write_back(self, uuid: str, context: str) -> None:
+        if self.db is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.logger.warning("No event loop, context for %s not persisted", uuid)
+            return
+
+        previous = self._pending_writes.get(uuid)
+
+        async def write() -> None:
+            # Keep writes for one session in order
+            if previous:
+                await asyncio.gather(previous, return_exceptions=True)
+            await metrics.timed("db_context_write", self.db.update_context(uuid, context))
+            await self.publish_change(uuid)
+
+        task = loop.create_task(write())
+        self._pending_writes[uuid] = task
+        task.add_done_callback(lambda t: self._write_done(uuid, t))
+
+    def _write_done(self, uuid: str, task: asyncio.Task) -> None:
+        if self._pending_writes.get(uuid) is task:
+            del self._pending_writes[uuid]
+        if not task.cancelled() and task.exception():
+            self.logger.error("Context write-back failed: %s", str(task.exception()))
@@ -0,0 +1,90 @@
+from typing import Awaitable, Callable, Dict, Optional
+from context_cache import SessionContextCache
+from config import config
+import asyncio
+import logging
+
+# Every turn's summary is one line of the session context
+SEGMENT_SEPARATOR = "\n"
+COMPACTED_PREFIX = "Earlier in the conversation: "
+
+
+class ContextCompactor:
+    """Keeps each session's context within a character budget.
+
+    Recent turn summaries stay verbatim; once the context grows past the budget,
+    the older ones are condensed into a single summary by a background task so
+    the turn that triggered it doesn't wait. Until that lands, clip() hard-caps
+    what goes into the prompt.
+    """
+
+    def __init__(
+        self,
+        cache: SessionContextCache,
+        summarize: Callable[[str, int], Awaitable[str]],
+        budget_chars: Optional[int] = None,
+        keep_recent_turns: Optional[int] = None,
+        summary_max_chars: Optional[int] = None,
+        hard_limit_chars: Optional[int] = None,
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cache = cache
+        self.summarize = summarize
+        self.budget_chars = budget_chars or config["context_budget_chars"]
+        self.keep_recent_turns = keep_recent_turns or config["context_keep_recent_turns"]
+        self.summary_max_chars = summary_max_chars or config["context_summary_max_chars"]
+        self.hard_limit_chars = hard_limit_chars or config["context_hard_limit_chars"]
+        self._running: Dict[str, asyncio.Task] = {}
+        self.compactions = 0
+
+    @staticmethod
+    def append(context: str, summary: str) -> str:
+        summary = " ".join(summary.split())
+        if not summary:
+            return context
+        return f"{context}{SEGMENT_SEPARATOR}{summary}" if context else summary
+
+    def clip(self, context: str) -> str:
+        """Cap the context that goes into a prompt, dropping the oldest text first."""
+        if len(context) <= self.hard_limit_chars:
+            return context
+        clipped = context[-self.hard_limit_chars :]
+        # Don't start the prompt in the middle of a summary
+        newline = clipped.find(SEGMENT_SEPARATOR)
+        return clipped[newline + 1 :] if newline != -1 else clipped
+
+    def maybe_compact(self, uuid: str) -> None:
+        """Schedule a compaction for the session if it is over budget."""
+        context = self.cache.peek(uuid).context
+        if len(context) <= self.budget_chars or uuid in self._running:
+            return
+        segments = context.split(SEGMENT_SEPARATOR)
+        if len(segments) <= self.keep_recent_turns:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._compact(uuid, segments))
+        self._running[uuid] = task
+        task.add_done_callback(lambda _: self._running.pop(uuid, None))
+
+    async def _compact(self, uuid: str, segments: list) -> None:
+        older = SEGMENT_SEPARATOR.join(segments[: -self.keep_recent_turns])
+        try:
+            condensed = await self.summarize(older, self.summary_max_chars)
+        except Exception as e:
+            self.logger.error("Context compaction failed: %s", str(e))
+            return
+
+        condensed = " ".join(condensed.split())[: self.summary_max_chars]
+        if condensed and not condensed.startswith(COMPACTED_PREFIX):
+            condensed = COMPACTED_PREFIX + condensed
+
+        # Turns may have been appended while the summary was being generated
+        current = self.cache.peek(uuid).context
+        if not current.startswith(older):
+            self.logger.debug("Context for %s changed underneath compaction", uuid)
+            return
+        self.cache.update(uuid, context=condensed + current[len(older) :])
+        self.compactions += 1
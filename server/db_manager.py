@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
 import redis
+import redis.asyncio
+from config import config
+from transcript_archive import RAW, Archive, ArchiveCache, archive_key, decode_archive
 import json
+import logging
 import os
+import time
 
 class AbstractDBManager(ABC):
     """Abstract base class that defines the interface for database operations."""
@@ -14,13 +19,37 @@ class AbstractDBManager(ABC):
         pass
 
     @abstractmethod
-    def fetch_transcript(self, session_id: int) -> Optional[List[Dict]]:
-        """Fetch a specific transcript by ID."""
+    def save_turn(
+        self, session_id: int, transcript_item: Dict, context: Optional[str] = None
+    ) -> bool:
+        """Append a transcript item and, if given, replace the session context
+        in a single round-trip."""
+        pass
+
+    @abstractmethod
+    def fetch_transcript(
+        self, session_id: int, start: int = 0, limit: Optional[int] = None
+    ) -> Optional[List[Dict]]:
+        """Fetch a specific transcript by ID, optionally only `limit` items from
+        `start` (negative starts count from the end, like Redis indexes)."""
         pass
 
     @abstractmethod
-    def list_sessions(self) -> List[int]:
-        """List all session IDs."""
+    def fetch_transcript_page(
+        self, session_id: int, before: Optional[int] = None, limit: int = 50
+    ) -> Optional[Dict]:
+        """Fetch up to `limit` items that precede index `before` (default: the latest).
+        Returns {"items", "start", "total"}; `start` is the cursor for the next older page."""
+        pass
+
+    @abstractmethod
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None) -> List[int]:
+        """List session IDs, newest first, optionally one page at a time."""
+        pass
+
+    @abstractmethod
+    def fetch_session_meta(self, session_ids: List[int]) -> List[Dict]:
+        """Lightweight sidebar metadata (title, turns, updated) for the given sessions."""
         pass
 
     @abstractmethod
@@ -54,66 +83,208 @@ class AbstractDBManager(ABC):
         """Delete a session and all its associated data."""
         pass
 
+    @abstractmethod
+    def next_turn_number(self, session_id: int) -> Optional[int]:
+        """Increment and return the session's turn counter, shared by all workers."""
+        pass
+
+
+def _redis_kwargs() -> Dict:
+    return {
+        "host": os.getenv("REDIS_HOST", ""),
+        "port": int(os.getenv("REDIS_PORT", "")),
+        "decode_responses": True,
+        "username": os.getenv("REDIS_USERNAME", ""),
+        "password": os.getenv("REDIS_PASSWORD", ""),
+    }
+
+
+def _queue_turn(pipe, session_id: str, transcript_item: dict, context: Optional[str]):
+    """Queue one turn's writes on a sync or async pipeline."""
+    query = transcript_item.get("query", "")
+    transcript_entry = json.dumps(
+        {
+            "query": query,
+            "response": transcript_item.get("response", ""),
+        }
+    )
+    now = time.time()
+    meta_key = f"session:{session_id}:meta"
+    # Only new sessions get a timestamp in the sessions sorted set
+    pipe.zadd("sessions", {session_id: now}, nx=True)
+    pipe.rpush(f"session:{session_id}", transcript_entry)
+    pipe.hincrby(meta_key, "turns", 1)
+    pipe.hset(meta_key, "updated", now)
+    if query:
+        pipe.hsetnx(meta_key, "title", query[: config["session_title_max_chars"]])
+    if context is not None:
+        pipe.set(f"session:{session_id}:context", context)
+    # An archived session that is active again must not expire
+    pipe.persist(meta_key)
+    pipe.persist(archive_key(session_id))
+
+
+def _range_end(start: int, limit: Optional[int]) -> int:
+    """Inclusive Redis end index for `limit` items from `start`."""
+    if limit is None:
+        return -1
+    end = start + limit - 1
+    # A page reaching past the end of a negative range means "to the end"
+    return -1 if start < 0 and end >= -1 else end
+
+
+def _page_range(before: Optional[int], limit: int):
+    """LRANGE bounds for the `limit` items preceding `before`, computable without LLEN
+    so that the length and the page can be fetched in the same round-trip."""
+    if before is None:
+        return -limit, -1
+    return max(0, before - limit), before - 1
+
+
+def _page_result(entries: List[str], total: int, before: Optional[int], limit: int) -> Dict:
+    end = total if before is None else max(0, min(before, total))
+    start = max(0, end - limit)
+    return {"items": [json.loads(entry) for entry in entries], "start": start, "total": total}
+
+
+def _slice(items: List[Dict], start: int, limit: Optional[int]) -> List[Dict]:
+    """items[start:] like LRANGE, for transcripts partly held in an archive."""
+    end = _range_end(start, limit)
+    return items[start : None if end == -1 else end + 1]
+
+
+def _archived_page(
+    archived: List[Dict], entries: List[str], before: Optional[int], limit: int
+) -> Dict:
+    items = archived + [json.loads(entry) for entry in entries]
+    total = len(items)
+    end = total if before is None else max(0, min(before, total))
+    start = max(0, end - limit)
+    return {"items": items[start:end], "start": start, "total": total}
+
+
+def _session_meta(session_id: str, meta: Dict, score: Optional[float]) -> Dict:
+    return {
+        "id": session_id,
+        "title": meta.get("title", ""),
+        "turns": int(meta["turns"]) if "turns" in meta else None,
+        "updated": float(meta.get("updated") or score or 0),
+    }
+
 
 class DBManager(AbstractDBManager):
     """Manages database operations for transcripts and call scripts using Redis."""
 
     def __init__(self):
-        """Initialize the DBManager with Redis connection."""
+        """Initialize the DBManager with a pooled Redis connection shared by all sessions."""
+        self.logger = logging.getLogger(self.__class__.__name__)
         self.redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST", ""),
-            port=int(os.getenv("REDIS_PORT", "")),
-            decode_responses=True,
-            username=os.getenv("REDIS_USERNAME", ""),
-            password=os.getenv("REDIS_PASSWORD", ""),
+            **_redis_kwargs(),
+            max_connections=config["redis_max_connections"],
         )
+        self.archive_cache = ArchiveCache()
+
+    def _load_archive(self, session_id: str, count: int) -> Archive:
+        """Inflate a session's archive, or take it from the cache."""
+        archive = self.archive_cache.get(session_id, count)
+        if archive is None:
+            blob = self.redis_client.execute_command("GET", archive_key(session_id), **RAW)
+            archive = decode_archive(blob) if blob else ([], "")
+            self.archive_cache.put(session_id, len(archive[0]), archive)
+        return archive
 
     def append_transcript(self, session_id: str, transcript_item: dict) -> bool:
         """Append a transcript item to a session's transcript list using Redis list operations.
         Creates a new session if session_id doesn't exist, otherwise appends to existing session."""
+        return self.save_turn(session_id, transcript_item)
+
+    def save_turn(
+        self, session_id: str, transcript_item: dict, context: Optional[str] = None
+    ) -> bool:
+        """Append a transcript item and optionally replace the context in one MULTI/EXEC."""
         try:
-            session_key = f"session:{session_id}"
-            transcript_entry = json.dumps(
-                {
-                    "query": transcript_item.get("query", ""),
-                    "response": transcript_item.get("response", ""),
-                }
-            )
-            # Add to sessions sorted set with timestamp if it's a new session
-            if self.redis_client.llen(session_key) == 0:
-                import time
-                self.redis_client.zadd("sessions", {session_id: time.time()})
-            
-            self.redis_client.rpush(session_key, transcript_entry)
+            pipe = self.redis_client.pipeline(transaction=True)
+            _queue_turn(pipe, session_id, transcript_item, context)
+            pipe.execute()
             return True
         except Exception as e:
-            print(f"Error appending transcript: {str(e)} \n\n {transcript_item}")
+            self.logger.error("Error appending transcript for %s: %s", session_id, str(e))
             return False
 
-    def list_sessions(self) -> List[str]:
-        """List all session IDs in reverse chronological order."""
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """List session IDs in reverse chronological order."""
+        try:
+            # Sessions sorted set is scored by creation timestamp
+            return self.redis_client.zrange(
+                "sessions", offset, _range_end(offset, limit), desc=True
+            )
+        except Exception as e:
+            self.logger.error("Error listing sessions: %s", str(e))
+            return []
+
+    def fetch_session_meta(self, session_ids: List[str]) -> List[Dict]:
+        """Sidebar metadata for the given sessions in one pipelined round-trip."""
         try:
-            # Get all sessions from the sorted set, ordered by score (timestamp)
-            session_ids = self.redis_client.zrange("sessions", 0, -1, True)
-            return session_ids
+            pipe = self.redis_client.pipeline(transaction=False)
+            for session_id in session_ids:
+                pipe.hgetall(f"session:{session_id}:meta")
+                pipe.zscore("sessions", session_id)
+            results = pipe.execute()
+            return [
+                _session_meta(session_id, results[2 * i], results[2 * i + 1])
+                for i, session_id in enumerate(session_ids)
+            ]
         except Exception as e:
-            print(f"Error listing sessions: {str(e)}")
+            self.logger.error("Error fetching session metadata: %s", str(e))
             return []
 
-    def fetch_transcript(self, session_id: str) -> Optional[List[Dict]]:
+    def fetch_transcript(
+        self, session_id: str, start: int = 0, limit: Optional[int] = None
+    ) -> Optional[List[Dict]]:
         """Fetch a specific transcript by ID using Redis list operations."""
         try:
             transcript_key = f"session:{session_id}"
-            transcript_entries = self.redis_client.lrange(transcript_key, 0, -1)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hget(f"session:{session_id}:meta", "archived")
+            pipe.lrange(transcript_key, start, _range_end(start, limit))
+            archived, transcript_entries = pipe.execute()
+            if archived:
+                # Older items are in the archive, newer ones in the list
+                archive = self._load_archive(session_id, int(archived))
+                entries = self.redis_client.lrange(transcript_key, 0, -1)
+                return _slice(archive[0] + [json.loads(e) for e in entries], start, limit)
             return (
                 [json.loads(entry) for entry in transcript_entries]
                 if transcript_entries
                 else []
             )
         except Exception as e:
-            print(f"Error fetching transcript: {str(e)}")
+            self.logger.error("Error fetching transcript: %s", str(e))
             return None
 
+    def fetch_transcript_page(
+        self, session_id: str, before: Optional[int] = None, limit: int = 50
+    ) -> Optional[Dict]:
+        """Fetch the page of transcript items preceding `before`."""
+        try:
+            transcript_key = f"session:{session_id}"
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hget(f"session:{session_id}:meta", "archived")
+            pipe.llen(transcript_key)
+            if before is None or before > 0:
+                pipe.lrange(transcript_key, *_page_range(before, limit))
+            archived, total, *entries = pipe.execute()
+            if archived:
+                return _archived_page(
+                    self._load_archive(session_id, int(archived))[0],
+                    self.redis_client.lrange(transcript_key, 0, -1),
+                    before,
+                    limit,
+                )
+            return _page_result(entries[0] if entries else [], total, before, limit)
+        except Exception as e:
+            self.logger.error("Error fetching transcript page: %s", str(e))
+            return None
 
     def add_call_script(self, script_name: str, script_content: str) -> bool:
         """Add a new call script."""
@@ -124,7 +295,7 @@ class DBManager(AbstractDBManager):
             self.redis_client.sadd("callscripts", script_name)
             return True
         except Exception as e:
-            print(f"Error adding call script: {str(e)}")
+            self.logger.error("Error adding call script: %s", str(e))
             return False
 
     def fetch_call_script(self, script_name: str) -> Optional[str]:
@@ -134,7 +305,7 @@ class DBManager(AbstractDBManager):
             script = self.redis_client.get(script_key)
             return script
         except Exception as e:
-            print(f"Error fetching call script: {str(e)}")
+            self.logger.error("Error fetching call script: %s", str(e))
             return None
 
     def list_call_scripts(self) -> List[str]:
@@ -142,7 +313,7 @@ class DBManager(AbstractDBManager):
         try:
             return list(self.redis_client.smembers("callscripts"))
         except Exception as e:
-            print(f"Error listing call scripts: {str(e)}")
+            self.logger.error("Error listing call scripts: %s", str(e))
             return []
 
     def update_context(self, session_id: str, updated_context: str) -> bool:
@@ -153,16 +324,22 @@ class DBManager(AbstractDBManager):
             self.redis_client.set(context_key, updated_context)
             return True
         except Exception as e:
-            print(f"Error appending context: {str(e)}")
+            self.logger.error("Error appending context: %s", str(e))
             return False
 
     def get_context(self, session_id: str) -> Optional[str]:
         """Get the entire context object for a session."""
         try:
             context_key = f"session:{session_id}:context"
-            return self.redis_client.get(context_key) or ""
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(context_key)
+            pipe.hget(f"session:{session_id}:meta", "archived")
+            context, archived = pipe.execute()
+            if context is None and archived:
+                return self._load_archive(session_id, int(archived))[1]
+            return context or ""
         except Exception as e:
-            print(f"Error fetching context: {str(e)}")
+            self.logger.error("Error fetching context: %s", str(e))
             return None
 
     def delete_session(self, session_id: str) -> bool:
@@ -170,13 +347,218 @@ class DBManager(AbstractDBManager):
         try:
             session_key = f"session:{session_id}"
             context_key = f"session:{session_id}:context"
+            meta_key = f"session:{session_id}:meta"
+
+            # Delete session transcript, context, archive and metadata, and drop it
+            # from the sessions sorted set
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(session_key, context_key, meta_key, archive_key(session_id))
+            pipe.zrem("sessions", str(session_id))
+            pipe.execute()
+            self.archive_cache.invalidate(session_id)
+            return True
+        except Exception as e:
+            self.logger.error("Error deleting session: %s", str(e))
+            return False
+
+    def next_turn_number(self, session_id: str) -> Optional[int]:
+        """Increment and return the session's turn counter."""
+        try:
+            return self.redis_client.hincrby(f"session:{session_id}:meta", "seq", 1)
+        except Exception as e:
+            self.logger.error("Error incrementing turn counter: %s", str(e))
+            return None
+
+
+class AsyncDBManager(AbstractDBManager):
+    """DBManager on redis.asyncio, for use from the event loop. Sessions share one
+    blocking connection pool, so bursts wait for a free connection instead of failing."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pool = redis.asyncio.BlockingConnectionPool(
+            **_redis_kwargs(),
+            max_connections=config["redis_max_connections"],
+            timeout=config["redis_pool_timeout"],
+        )
+        self.redis_client = redis.asyncio.Redis(connection_pool=self.pool)
+        self.archive_cache = ArchiveCache()
+
+    async def _load_archive(self, session_id: str, count: int) -> Archive:
+        """Inflate a session's archive, or take it from the cache."""
+        archive = self.archive_cache.get(session_id, count)
+        if archive is None:
+            blob = await self.redis_client.execute_command(
+                "GET", archive_key(session_id), **RAW
+            )
+            archive = decode_archive(blob) if blob else ([], "")
+            self.archive_cache.put(session_id, len(archive[0]), archive)
+        return archive
 
-            # Delete session transcript and context
-            self.redis_client.delete(session_key, context_key)
+    async def append_transcript(self, session_id: str, transcript_item: dict) -> bool:
+        """Append a transcript item to a session's transcript list."""
+        return await self.save_turn(session_id, transcript_item)
 
-            # Remove from sessions sorted set
-            self.redis_client.zrem("sessions", str(session_id))
+    async def save_turn(
+        self, session_id: str, transcript_item: dict, context: Optional[str] = None
+    ) -> bool:
+        """Append a transcript item and optionally replace the context in one MULTI/EXEC."""
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                _queue_turn(pipe, session_id, transcript_item, context)
+                await pipe.execute()
             return True
         except Exception as e:
-            print(f"Error deleting session: {str(e)}")
+            self.logger.error("Error appending transcript for %s: %s", session_id, str(e))
             return False
+
+    async def list_sessions(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """List session IDs in reverse chronological order."""
+        try:
+            return await self.redis_client.zrange(
+                "sessions", offset, _range_end(offset, limit), desc=True
+            )
+        except Exception as e:
+            self.logger.error("Error listing sessions: %s", str(e))
+            return []
+
+    async def fetch_session_meta(self, session_ids: List[str]) -> List[Dict]:
+        """Sidebar metadata for the given sessions in one pipelined round-trip."""
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for session_id in session_ids:
+                    pipe.hgetall(f"session:{session_id}:meta")
+                    pipe.zscore("sessions", session_id)
+                results = await pipe.execute()
+            return [
+                _session_meta(session_id, results[2 * i], results[2 * i + 1])
+                for i, session_id in enumerate(session_ids)
+            ]
+        except Exception as e:
+            self.logger.error("Error fetching session metadata: %s", str(e))
+            return []
+
+    async def fetch_transcript(
+        self, session_id: str, start: int = 0, limit: Optional[int] = None
+    ) -> Optional[List[Dict]]:
+        """Fetch a specific transcript by ID."""
+        try:
+            transcript_key = f"session:{session_id}"
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hget(f"session:{session_id}:meta", "archived")
+                pipe.lrange(transcript_key, start, _range_end(start, limit))
+                archived, transcript_entries = await pipe.execute()
+            if archived:
+                # Older items are in the archive, newer ones in the list
+                archive = await self._load_archive(session_id, int(archived))
+                entries = await self.redis_client.lrange(transcript_key, 0, -1)
+                return _slice(archive[0] + [json.loads(e) for e in entries], start, limit)
+            return [json.loads(entry) for entry in transcript_entries]
+        except Exception as e:
+            self.logger.error("Error fetching transcript: %s", str(e))
+            return None
+
+    async def fetch_transcript_page(
+        self, session_id: str, before: Optional[int] = None, limit: int = 50
+    ) -> Optional[Dict]:
+        """Fetch the page of transcript items preceding `before`."""
+        try:
+            transcript_key = f"session:{session_id}"
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hget(f"session:{session_id}:meta", "archived")
+                pipe.llen(transcript_key)
+                if before is None or before > 0:
+                    pipe.lrange(transcript_key, *_page_range(before, limit))
+                archived, total, *entries = await pipe.execute()
+            if archived:
+                archive = await self._load_archive(session_id, int(archived))
+                return _archived_page(
+                    archive[0],
+                    await self.redis_client.lrange(transcript_key, 0, -1),
+                    before,
+                    limit,
+                )
+            return _page_result(entries[0] if entries else [], total, before, limit)
+        except Exception as e:
+            self.logger.error("Error fetching transcript page: %s", str(e))
+            return None
+
+    async def add_call_script(self, script_name: str, script_content: str) -> bool:
+        """Add a new call script."""
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(f"callscript:{script_name}", script_content)
+                pipe.sadd("callscripts", script_name)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self.logger.error("Error adding call script: %s", str(e))
+            return False
+
+    async def fetch_call_script(self, script_name: str) -> Optional[str]:
+        """Fetch a specific call script by name."""
+        try:
+            return await self.redis_client.get(f"callscript:{script_name}")
+        except Exception as e:
+            self.logger.error("Error fetching call script: %s", str(e))
+            return None
+
+    async def list_call_scripts(self) -> List[str]:
+        """List all call script names."""
+        try:
+            return list(await self.redis_client.smembers("callscripts"))
+        except Exception as e:
+            self.logger.error("Error listing call scripts: %s", str(e))
+            return []
+
+    async def update_context(self, session_id: str, updated_context: str) -> bool:
+        """Replace the context data for a session."""
+        try:
+            await self.redis_client.set(f"session:{session_id}:context", updated_context)
+            return True
+        except Exception as e:
+            self.logger.error("Error appending context: %s", str(e))
+            return False
+
+    async def get_context(self, session_id: str) -> Optional[str]:
+        """Get the entire context object for a session."""
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(f"session:{session_id}:context")
+                pipe.hget(f"session:{session_id}:meta", "archived")
+                context, archived = await pipe.execute()
+            if context is None and archived:
+                return (await self._load_archive(session_id, int(archived)))[1]
+            return context or ""
+        except Exception as e:
+            self.logger.error("Error fetching context: %s", str(e))
+            return None
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session and all its associated data in one round-trip."""
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(
+                    f"session:{session_id}",
+                    f"session:{session_id}:context",
+                    f"session:{session_id}:meta",
+                    archive_key(session_id),
+                )
+                pipe.zrem("sessions", str(session_id))
+                await pipe.execute()
+            self.archive_cache.invalidate(session_id)
+            return True
+        except Exception as e:
+            self.logger.error("Error deleting session: %s", str(e))
+            return False
+
+    async def next_turn_number(self, session_id: str) -> Optional[int]:
+        """Increment and return the session's turn counter."""
+        try:
+            return await self.redis_client.hincrby(f"session:{session_id}:meta", "seq", 1)
+        except Exception as e:
+            self.logger.error("Error incrementing turn counter: %s", str(e))
+            return None
+
+    async def close(self) -> None:
+        await self.redis_client.aclose()
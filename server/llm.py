@@ -1,10 +1,27 @@
-from typing import Optional
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Union
 from abc import ABC, abstractmethod
-from google import genai
+from config import config
+from text_stream import ResponseFieldParser
+from context_cache import SessionContext, SessionContextCache
+from context_compactor import ContextCompactor
+from llm_cache import ResponseCache
+from audio import mime_type_for
+import asyncio
+import hashlib
+import io
+import metrics
 import logging
 import json
+import time
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from google import genai
+
+
+# A file path, or the raw bytes of an in-memory clip
+AudioInput = Optional[Union[str, bytes]]
+
 
 class TranscriptItem(BaseModel):
     query: str
@@ -22,64 +39,428 @@ class LLM(ABC):
 
     @abstractmethod
     def generate_response(
-        self, uuid: str, prompt: str, audio_path: Optional[str]
+        self, uuid: str, prompt: str, audio: AudioInput
     ) -> str:
         pass
 
+    def record_interrupted_turn(self, uuid: str, partial_response: str) -> None:
+        """Called when a turn is cancelled before the full response was produced."""
+        pass
+
+
+class AsyncLLM(LLM):
+    """LLM that can also be awaited from the event loop without blocking it."""
+
+    def __init__(self, model_name: Optional[str], timeout: Optional[float] = None):
+        super().__init__(model_name)
+        self.timeout = timeout or config["llm_timeout"]
+
+    @abstractmethod
+    async def agenerate_response(
+        self, uuid: str, prompt: str, audio: AudioInput
+    ) -> dict:
+        """Async counterpart of generate_response. Cancelling the awaiting task
+        cancels the in-flight provider request."""
+        pass
+
+    async def astream_response(
+        self, uuid: str, prompt: str, audio: AudioInput
+    ) -> AsyncIterator[Union[str, dict]]:
+        """Yield the spoken response as text deltas, then the full TranscriptItem dict.
+        Providers without streaming support yield the whole response at once."""
+        resp = await self.agenerate_response(uuid, prompt, audio)
+        yield resp["response"]
+        yield resp
+
+    async def asummarize(self, text: str, max_chars: int) -> str:
+        """Condense text to at most max_chars. Used off the hot path for context
+        compaction; providers without a cheap summarizer just keep the tail."""
+        return text[-max_chars:]
+
+    def fallback_response(self, uuid: str) -> dict:
+        """TranscriptItem dict to answer with when a turn fails."""
+        return {"query": "", "response": "Please try again later", "context": ""}
+
+    def prompt_cache_handle(self) -> Optional[str]:
+        """Provider-side cache of the static instructions for the next request to
+        reference, or None to send them inline. Providers with prompt caching
+        create and refresh it here without blocking the request."""
+        return None
+
+
+def _rejected_request(error: Exception) -> bool:
+    """A 4xx from Gemini, as opposed to a timeout or a server error."""
+    from google.genai import errors
+
+    return isinstance(error, errors.ClientError)
+
+
+class GeminiPromptCache:
+    """Gemini cached content holding one model's system instruction and prompt
+    prefix, so requests only carry the per-turn parts.
+
+    It is created in the background on first use and refreshed before it
+    expires; until then requests send the instructions inline. If the model or
+    the account can't cache them (e.g. below the minimum cacheable size),
+    creation is retried after retry_seconds.
+    """
+
+    def __init__(
+        self,
+        client: "genai.Client",
+        model_name: str,
+        system_instruction: str,
+        prompt_prefix: str,
+        ttl_seconds: Optional[int] = None,
+        refresh_seconds: Optional[int] = None,
+        retry_seconds: Optional[int] = None,
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.client = client
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.prompt_prefix = prompt_prefix
+        self.ttl_seconds = ttl_seconds or config["llm_prompt_cache_ttl_seconds"]
+        self.refresh_seconds = refresh_seconds or config["llm_prompt_cache_refresh_seconds"]
+        self.retry_seconds = retry_seconds or config["llm_prompt_cache_retry_seconds"]
+
+        self.name: Optional[str] = None
+        self.expires = 0.0
+        self.retry_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def handle(self) -> Optional[str]:
+        now = time.monotonic()
+        refreshing = self._task is not None and not self._task.done()
+        if (
+            not refreshing
+            and now >= self.retry_at
+            and (self.name is None or now >= self.expires - self.refresh_seconds)
+        ):
+            self._task = asyncio.create_task(self._refresh())
+        return self.name if self.name and now < self.expires else None
+
+    def invalidate(self) -> None:
+        """The provider rejected the handle, e.g. the cache was deleted."""
+        self.name = None
+        self.retry_at = time.monotonic() + self.retry_seconds
+
+    async def _refresh(self) -> None:
+        ttl = f"{self.ttl_seconds}s"
+        try:
+            if self.name and time.monotonic() < self.expires:
+                await self.client.aio.caches.update(name=self.name, config={"ttl": ttl})
+            else:
+                cached = await self.client.aio.caches.create(
+                    model=self.model_name,
+                    config={
+                        "system_instruction": self.system_instruction,
+                        "contents": [self.prompt_prefix],
+                        "display_name": "voice-agent-instructions",
+                        "ttl": ttl,
+                    },
+                )
+                self.name = cached.name
+                self.logger.info("Created prompt cache %s for %s", self.name, self.model_name)
+            self.expires = time.monotonic() + self.ttl_seconds
+        except Exception as e:
+            self.logger.warning("Prompt caching unavailable, sending instructions inline: %s", str(e))
+            self.invalidate()
+
+
+class GeminiLLM(AsyncLLM):
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        session_cache: Optional[SessionContextCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ):
+        # The SDK takes most of the server's import time, so it is only loaded
+        # once an LLM is needed (ClientPool warms it up off the event loop)
+        from google import genai
 
-class GeminiLLM(LLM):
-    def __init__(self, model_name: Optional[str] = None):
         super().__init__(model_name or "gemini-2.0-flash")
         self.client = genai.Client()
         self.logger = logging.getLogger(self.__class__.__name__)
         # Could vary based on the model/provider. Keeping it here for now
         self.prompt_prefix = "Cheerfully respond to query in the audio or text. Keep the context in mind as the user might refer back to it and keep updating it as the conversation proceeds. Use the following schema: {'query': <the query verbatim>, 'response': <your response>, 'context': <only the summary of the current query and response>}. This is the query:"
-        self.context = dict()
-        self.last_response = dict()
+        self.system_instruction = "You will be provided a text or audio prompt with some context and a last response so you remember the flow of the conversation. The prompts contain queries which you should respond to. The queries might refer to something in the context but not necessarily. Always return a summary as context of the current exchange only, not the past ones. Your response will be fed to a TTS engine so avoid asterisks and similar special characters. Make sure the context is succint while not losing any details. Feel free to include emojis and write in paragraphs if the answer is too long to make things more readable and user friendly"
+        # Context summaries and last responses per session uuid
+        self.session_cache = session_cache or SessionContextCache()
+        self.compactor = ContextCompactor(self.session_cache, self.asummarize)
+        self.inline_audio_max_bytes = config["inline_audio_max_bytes"]
+        self.response_cache = response_cache
+        self.prompt_cache = (
+            GeminiPromptCache(
+                self.client, self.model_name, self.system_instruction, self.prompt_prefix
+            )
+            if config["llm_prompt_cache"]
+            else None
+        )
+        # Cached responses are only valid for the instructions that produced them
+        self.instructions_version = hashlib.sha256(
+            (self.prompt_prefix + "\0" + self.system_instruction).encode()
+        ).hexdigest()[:16]
 
     def generate_response(
-        self, uuid: str, prompt: str, audio_path: Optional[str]
+        self, uuid: str, prompt: str, audio: AudioInput
     ) -> dict:
         try:
-            audio_file = ""
-            if audio_path:
-                audio_file = self.client.files.upload(file=audio_path)
-                self.logger.debug("Uploaded audio file: %s", audio_file)
-
-            # Initialize context and last_response for new UUIDs
-            if uuid not in self.context:
-                self.context[uuid] = ""
-            if uuid not in self.last_response:
-                self.last_response[uuid] = ""
+            audio_file = self._prepare_audio(audio)
+            session = self.session_cache.get(uuid)
 
             response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=self._build_contents(session, prompt, audio_file),
+                config=self._generation_config(),
+            )
+            return self._record_response(uuid, session, response.text)
+        except Exception as e:
+            self.logger.error("Error in generate_response: %s", str(e))
+            return self.fallback_response(uuid)
+
+    async def agenerate_response(
+        self, uuid: str, prompt: str, audio: AudioInput
+    ) -> dict:
+        try:
+            return await asyncio.wait_for(
+                self._agenerate(uuid, prompt, audio), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.logger.error("Gemini request timed out after %ss", self.timeout)
+            return self.fallback_response(uuid)
+        except asyncio.CancelledError:
+            self.logger.debug("Gemini request cancelled for %s", uuid)
+            raise
+        except Exception as e:
+            self.logger.error("Error in agenerate_response: %s", str(e))
+            return self.fallback_response(uuid)
+
+    async def _agenerate(
+        self, uuid: str, prompt: str, audio: AudioInput
+    ) -> dict:
+        audio_file = await self._aprepare_audio(audio)
+        session = await self.session_cache.aget(uuid)
+        cache_key = self._cache_key(session, prompt, audio)
+        if cache_key and (cached := await self.response_cache.get(cache_key)):
+            return self._record_response(uuid, session, cached)
+
+        started = time.perf_counter()
+        cache_name = self.prompt_cache_handle()
+        try:
+            response = await self._agenerate_content(session, prompt, audio_file, cache_name)
+        except Exception as e:
+            if not cache_name or not _rejected_request(e):
+                raise
+            self._drop_prompt_cache(e)
+            response = await self._agenerate_content(session, prompt, audio_file, None)
+        resp = self._record_response(uuid, session, response.text)
+        if cache_key:
+            await self.response_cache.put(
+                cache_key, response.text, time.perf_counter() - started
+            )
+        return resp
+
+    async def astream_response(
+        self, uuid: str, prompt: str, audio: AudioInput
+    ) -> AsyncIterator[Union[str, dict]]:
+        parser = ResponseFieldParser()
+        raw_chunks = []
+        streamed = ""
+        try:
+            audio_file = await asyncio.wait_for(
+                self._aprepare_audio(audio), timeout=self.timeout
+            )
+            session = await self.session_cache.aget(uuid)
+            cache_key = self._cache_key(session, prompt, audio)
+            if cache_key and (cached := await self.response_cache.get(cache_key)):
+                resp = self._record_response(uuid, session, cached)
+                yield resp["response"]
+                yield resp
+                return
+
+            started = time.perf_counter()
+            cache_name = self.prompt_cache_handle()
+            try:
+                stream, chunk = await self._aopen_stream(
+                    session, prompt, audio_file, cache_name
+                )
+            except Exception as e:
+                if not cache_name or not _rejected_request(e):
+                    raise
+                # Nothing has been yielded yet, so retry with inline instructions
+                self._drop_prompt_cache(e)
+                stream, chunk = await self._aopen_stream(session, prompt, audio_file, None)
+            while chunk is not None:
+                if chunk.text:
+                    raw_chunks.append(chunk.text)
+                    delta = parser.feed(chunk.text)
+                    if delta:
+                        streamed += delta
+                        yield delta
+                chunk = await self._anext_chunk(stream)
+
+            resp = self._record_response(uuid, session, "".join(raw_chunks))
+            if cache_key:
+                await self.response_cache.put(
+                    cache_key, "".join(raw_chunks), time.perf_counter() - started
+                )
+        except asyncio.CancelledError:
+            self.logger.debug("Gemini stream cancelled for %s", uuid)
+            raise
+        except Exception as e:
+            self.logger.error("Error in astream_response: %s", str(e))
+            resp = self.fallback_response(uuid)
+            if streamed:
+                # Keep what was already spoken instead of contradicting it
+                resp["response"] = streamed
+            else:
+                yield resp["response"]
+
+        yield resp
+
+    async def asummarize(self, text: str, max_chars: int) -> str:
+        response = await asyncio.wait_for(
+            self.client.aio.models.generate_content(
                 model=self.model_name,
                 contents=[
-                    (self.prompt_prefix + prompt),
-                    audio_file,
-                    "Last AI response: " + self.last_response[uuid],
-                    "Context: " + self.context[uuid],
+                    f"Condense these summaries of earlier conversation turns into one summary of at most {max_chars} characters. Keep names, facts, numbers, preferences and open questions; drop pleasantries.",
+                    text,
                 ],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": TranscriptItem,
-                    "system_instruction": "You will be provided a text or audio prompt with some context and a last response so you remember the flow of the conversation. The prompts contain queries which you should respond to. The queries might refer to something in the context but not necessarily. Always return a summary as context of the current exchange only, not the past ones. Your response will be fed to a TTS engine so avoid asterisks and similar special characters. Make sure the context is succint while not losing any details. Feel free to include emojis and write in paragraphs if the answer is too long to make things more readable and user friendly",
-                },
+            ),
+            timeout=self.timeout,
+        )
+        return response.text or ""
+
+    def prompt_cache_handle(self) -> Optional[str]:
+        return self.prompt_cache.handle() if self.prompt_cache else None
+
+    def _drop_prompt_cache(self, error: Exception) -> None:
+        """A request referencing the cache was rejected, e.g. it expired early."""
+        self.logger.warning("Request with prompt cache failed, retrying inline: %s", str(error))
+        self.prompt_cache.invalidate()
+
+    async def _agenerate_content(
+        self, session: SessionContext, prompt: str, audio_file, cache_name: Optional[str]
+    ):
+        return await self.client.aio.models.generate_content(
+            model=self.model_name,
+            contents=self._build_contents(session, prompt, audio_file, cache_name),
+            config=self._generation_config(cache_name),
+        )
+
+    async def _aopen_stream(
+        self, session: SessionContext, prompt: str, audio_file, cache_name: Optional[str]
+    ) -> tuple:
+        """Start a stream and wait for its first chunk, where request errors surface."""
+        stream = await asyncio.wait_for(
+            self.client.aio.models.generate_content_stream(
+                model=self.model_name,
+                contents=self._build_contents(session, prompt, audio_file, cache_name),
+                config=self._generation_config(cache_name),
+            ),
+            timeout=self.timeout,
+        )
+        return stream, await self._anext_chunk(stream)
+
+    async def _anext_chunk(self, stream):
+        # The timeout applies to the gap between chunks, not the whole answer
+        try:
+            return await asyncio.wait_for(anext(stream), timeout=self.timeout)
+        except StopAsyncIteration:
+            return None
+
+    def _prepare_audio(self, audio: AudioInput):
+        """Inline short clips; paths and large clips go through the Files API."""
+        if not audio:
+            return ""
+        from google.genai import types
+
+        if isinstance(audio, str):
+            return self.client.files.upload(file=audio)
+        if len(audio) <= self.inline_audio_max_bytes:
+            return types.Part.from_bytes(data=audio, mime_type=mime_type_for(audio))
+        return self.client.files.upload(
+            file=io.BytesIO(audio), config={"mime_type": mime_type_for(audio)}
+        )
+
+    async def _aprepare_audio(self, audio: AudioInput):
+        if not audio:
+            return ""
+        from google.genai import types
+
+        with metrics.span("upload"):
+            if isinstance(audio, str):
+                return await self.client.aio.files.upload(file=audio)
+            if len(audio) <= self.inline_audio_max_bytes:
+                return types.Part.from_bytes(data=audio, mime_type=mime_type_for(audio))
+            return await self.client.aio.files.upload(
+                file=io.BytesIO(audio), config={"mime_type": mime_type_for(audio)}
             )
 
-            jsonresp = json.loads(response.text)
-            self.context[uuid] += jsonresp["context"]
-            self.last_response[uuid] = jsonresp["response"]
-            print(f"\nContext: {self.context[uuid]} \n")
+    def _cache_key(
+        self, session: SessionContext, prompt: str, audio: AudioInput
+    ) -> Optional[str]:
+        """Only text queries are cached; audio is never the same twice."""
+        if self.response_cache is None or audio or not prompt.strip():
+            return None
+        return self.response_cache.key(
+            prompt,
+            self.model_name,
+            self.instructions_version,
+            session.context,
+            session.last_response,
+        )
 
-            return jsonresp
-        except Exception as e:
-            self.logger.error("Error in generate_response: %s", str(e))
-            return {
-                "query": "",
-                "response": "Please try again later",
-                "context": self.context[uuid],
-            }
+    def _build_contents(
+        self,
+        session: SessionContext,
+        prompt: str,
+        audio_file,
+        cache_name: Optional[str] = None,
+    ) -> list:
+        return [
+            # A prompt cache already holds the prefix, ahead of these contents
+            prompt if cache_name else (self.prompt_prefix + prompt),
+            audio_file,
+            "Last AI response: " + session.last_response,
+            "Context: " + self.compactor.clip(session.context),
+        ]
+
+    def _generation_config(self, cache_name: Optional[str] = None) -> dict:
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": TranscriptItem,
+        }
+        if cache_name:
+            # The system instruction is part of the cached content
+            generation_config["cached_content"] = cache_name
+        else:
+            generation_config["system_instruction"] = self.system_instruction
+        return generation_config
+
+    def _record_response(self, uuid: str, session: SessionContext, text: str) -> dict:
+        jsonresp = json.loads(text)
+        session = self.session_cache.update(
+            uuid,
+            context=self.compactor.append(session.context, jsonresp["context"]),
+            last_response=jsonresp["response"],
+            # Saved along with the transcript item by the caller
+            persist=False,
+        )
+        self.compactor.maybe_compact(uuid)
+        self.logger.debug("Context for %s: %d chars", uuid, len(session.context))
+        return jsonresp
+
+    def record_interrupted_turn(self, uuid: str, partial_response: str) -> None:
+        self.session_cache.update(uuid, last_response=partial_response)
+
+    def fallback_response(self, uuid: str) -> dict:
+        return {
+            "query": "",
+            "response": "Please try again later",
+            "context": self.session_cache.peek(uuid).context,
+        }
 
     def get_llm(self):
         return self
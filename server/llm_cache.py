@@ -0,0 +1,140 @@
+from typing import TYPE_CHECKING, Dict, Optional
+from collections import OrderedDict
+from config import config
+import hashlib
+import logging
+import metrics
+import string
+import time
+
+if TYPE_CHECKING:
+    from db_manager import AsyncDBManager
+
+
+class ResponseCache:
+    """Whole LLM responses for repeated queries in the same conversation state,
+    such as the same opener at the start of fresh sessions.
+
+    Keys cover everything that changes the answer: the normalized prompt, the
+    model, the version of the instructions and the session's context and last
+    response. Entries expire after a TTL and the LRU is capped by entries and
+    bytes. With a database, Redis is a second tier shared by all workers.
+    """
+
+    def __init__(
+        self,
+        db: Optional["AsyncDBManager"] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.db = db
+        self.max_entries = max_entries or config["llm_cache_max_entries"]
+        self.max_bytes = max_bytes or config["llm_cache_max_bytes"]
+        self.ttl_seconds = ttl_seconds or config["llm_cache_ttl_seconds"]
+        self.key_prefix = config["llm_cache_redis_prefix"]
+
+        # key -> (expires at, raw response)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        # Running mean of what a miss costs, to estimate what a hit saves
+        self._miss_seconds = 0.0
+        self._timed_misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": self.seconds_saved,
+        }
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """Case, spacing and trailing punctuation don't change the question."""
+        return " ".join(prompt.lower().split()).rstrip(string.punctuation + " ")
+
+    @classmethod
+    def key(
+        cls,
+        prompt: str,
+        model_name: str,
+        instructions_version: str,
+        context: str,
+        last_response: str,
+    ) -> str:
+        digest = hashlib.sha256(cls.normalize(prompt).encode())
+        for part in (model_name, instructions_version, context, last_response):
+            digest.update(b"\0" + part.encode())
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        started = time.perf_counter()
+        text = self._lookup(key)
+        if text is None and self.db is not None:
+            text = await self._redis_get(key)
+            if text is not None:
+                self.redis_hits += 1
+                self._store(key, text)
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._timed_misses:
+            saved = max(0.0, self._miss_seconds - (time.perf_counter() - started))
+            self.seconds_saved += saved
+            metrics.LLM_CACHE_SECONDS_SAVED.inc(saved)
+        return text
+
+    async def put(self, key: str, text: str, seconds: float) -> None:
+        """Cache a response that took `seconds` to generate."""
+        self._timed_misses += 1
+        self._miss_seconds += (seconds - self._miss_seconds) / self._timed_misses
+        self._store(key, text)
+        if self.db is not None:
+            try:
+                await self.db.redis_client.set(
+                    self.key_prefix + key, text, ex=self.ttl_seconds
+                )
+            except Exception as e:
+                self.logger.warning("Could not share cached response: %s", str(e))
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, text = entry
+        if time.monotonic() > expires:
+            del self._entries[key]
+            self._bytes -= len(text)
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    async def _redis_get(self, key: str) -> Optional[str]:
+        try:
+            return await self.db.redis_client.get(self.key_prefix + key)
+        except Exception as e:
+            self.logger.warning("Shared response cache unavailable: %s", str(e))
+            return None
+
+    def _store(self, key: str, text: str) -> None:
+        if len(text) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous:
+            self._bytes -= len(previous[1])
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+        self._bytes += len(text)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
@@ -1,34 +1,79 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from connection import Connection
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from session_manager import SessionManager
+from config import config
+import json
+import logging
+import metrics
 import os
 
-app = FastAPI()
+logging.basicConfig(
+    level=config["log_level"],
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger("main")
+
+session_manager = SessionManager()
+metrics.bind_session_manager(session_manager)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Provider SDKs load in the background; sockets are accepted meanwhile
+    session_manager.pool.start()
+    yield
+    await session_manager.pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/health")
+async def health_endpoint():
+    return {"status": "ok", "clients_ready": session_manager.pool.clients_ready}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-connection = Connection()
 
 @app.websocket("/connect")
 async def connect_endpoint(websocket: WebSocket):
     """Single WebSocket endpoint that handles all communication with frontend."""
+    connection = None
     try:
-        await connection.connect(websocket)
+        connection = await session_manager.open(websocket)
 
         await websocket.send_json(
             {"type": "connection_established", "message": "Connection established"}
         )
 
         while True:
-            message = await websocket.receive_json()
-            await connection.handle_message(message)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                metrics.MESSAGES.labels("audio_frame").inc()
+                await connection.handle_audio_frame(message["bytes"])
+            else:
+                with metrics.span("decode"):
+                    data = json.loads(message["text"])
+                metrics.MESSAGES.labels(metrics.message_label(data.get("type"))).inc()
+                await connection.handle_message(data)
 
     except WebSocketDisconnect:
-        connection.is_connected = False
-        print("debug> Frontend disconnected")
+        logger.debug("Frontend disconnected")
     except Exception as e:
-        connection.is_connected = False
-        print(f"Connection error: {e}")
+        logger.error("Connection error: %s", str(e))
+    finally:
+        if connection:
+            session_manager.close(connection)
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Workers share nothing but Redis; WEB_CONCURRENCY sets how many to run
+    uvicorn.run("main:app", host="0.0.0.0", port=port)
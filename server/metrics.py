@@ -0,0 +1,187 @@
+"""Prometheus metrics for turns, audio and caches, served on /metrics.
+
+Turn stages are timed in two ways. span() measures how long a step itself
+takes (decode, upload, Redis writes). mark() measures time from the start of
+the current turn, which is what the user waits for (LLM first token, first
+audio). The turn start lives in a context variable, so tasks spawned by a turn
+(such as the TTS player) report against the same turn.
+"""
+
+from typing import TYPE_CHECKING, Awaitable, Iterator, Optional, Set, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+import time
+
+if TYPE_CHECKING:
+    from session_manager import SessionManager
+
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "voice_agent_stage_seconds",
+    "Duration of one step of handling a message or turn",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+TURN_LATENCY_SECONDS = Histogram(
+    "voice_agent_turn_latency_seconds",
+    "Time from the start of a turn until a milestone in it",
+    ["milestone"],
+    buckets=LATENCY_BUCKETS,
+)
+TURNS = Counter(
+    "voice_agent_turns_total", "Turns by input type and outcome", ["input", "outcome"]
+)
+MESSAGES = Counter(
+    "voice_agent_messages_total", "Frontend messages received by type", ["type"]
+)
+AUDIO_RECEIVED_BYTES = Counter(
+    "voice_agent_audio_received_bytes_total", "User audio bytes received"
+)
+AUDIO_SENT_BYTES = Counter(
+    "voice_agent_audio_sent_bytes_total", "Synthesized audio bytes sent to clients"
+)
+ACTIVE_SESSIONS = Gauge("voice_agent_active_sessions", "Open websocket sessions")
+BUFFERED_AUDIO_BYTES = Gauge(
+    "voice_agent_buffered_audio_bytes", "User audio buffered for utterances in progress"
+)
+BACKGROUND_TASKS = Gauge(
+    "voice_agent_background_tasks", "Fire-and-forget tasks (persistence) in flight"
+)
+CACHE_ENTRIES = Gauge("voice_agent_cache_entries", "Entries held per cache", ["cache"])
+CACHE_BYTES = Gauge("voice_agent_cache_bytes", "Bytes held per cache", ["cache"])
+CACHE_HIT_RATIO = Gauge("voice_agent_cache_hit_ratio", "Lookup hit ratio per cache", ["cache"])
+SCHEDULER_QUEUED = Gauge(
+    "voice_agent_scheduler_queued", "Turns waiting for a provider slot", ["resource"]
+)
+SCHEDULER_RUNNING = Gauge(
+    "voice_agent_scheduler_running", "Turns holding a provider slot", ["resource"]
+)
+SCHEDULER_REJECTED = Counter(
+    "voice_agent_scheduler_rejected_total",
+    "Turns turned away with a busy message, by which queue was full",
+    ["reason"],
+)
+ARCHIVED_SESSIONS = Counter(
+    "voice_agent_archived_sessions_total", "Idle sessions moved into compressed archives"
+)
+ARCHIVE_BYTES_SAVED = Counter(
+    "voice_agent_archive_bytes_saved_total",
+    "Transcript and context bytes removed from Redis by archiving",
+)
+TTS_CACHE_BYTES_SAVED = Counter(
+    "voice_agent_tts_cache_bytes_saved_total",
+    "Audio bytes served from the TTS cache instead of being synthesized",
+)
+LLM_CACHE_SECONDS_SAVED = Counter(
+    "voice_agent_llm_cache_seconds_saved_total",
+    "Estimated model time skipped by serving cached responses",
+)
+
+
+# Message types used as label values; anything else a client sends is "unknown"
+# so a misbehaving client can't create unbounded series
+MESSAGE_TYPES = frozenset(
+    {
+        "new_session",
+        "get_sessions",
+        "get_session_page",
+        "get_transcript_page",
+        "get_transcripts",
+        "kill_streaming",
+        "set_tts",
+        "delete_session",
+        "text",
+        "audio",
+    }
+)
+
+
+def message_label(message_type: Optional[str]) -> str:
+    return message_type if message_type in MESSAGE_TYPES else "unknown"
+
+
+class TurnTimer:
+    __slots__ = ("start", "marked")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marked: Set[str] = set()
+
+
+_current_turn: ContextVar[Optional[TurnTimer]] = ContextVar("current_turn", default=None)
+
+
+def start_turn() -> TurnTimer:
+    """Start timing a turn in the current task and the tasks it creates."""
+    timer = TurnTimer()
+    _current_turn.set(timer)
+    return timer
+
+
+def mark(milestone: str) -> None:
+    """Record time since the current turn started, once per milestone and turn."""
+    timer = _current_turn.get()
+    if timer is None or milestone in timer.marked:
+        return
+    timer.marked.add(milestone)
+    TURN_LATENCY_SECONDS.labels(milestone).observe(time.perf_counter() - timer.start)
+
+
+def observe(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+async def timed(stage: str, awaitable: Awaitable[T]) -> T:
+    with span(stage):
+        return await awaitable
+
+
+def _hit_ratio(stats: dict) -> float:
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else 0.0
+
+
+def bind_session_manager(manager: "SessionManager") -> None:
+    """Point the gauges at a session manager; they are read at scrape time."""
+    pool = manager.pool
+    ACTIVE_SESSIONS.set_function(lambda: manager.active_sessions)
+    BUFFERED_AUDIO_BYTES.set_function(
+        lambda: sum(len(c.audio_buffer) for c in list(manager.connections.values()))
+    )
+    BACKGROUND_TASKS.set_function(lambda: len(pool._background))
+    for name, limiter in pool.scheduler.limiters.items():
+        SCHEDULER_QUEUED.labels(name).set_function(limiter.queued)
+        SCHEDULER_RUNNING.labels(name).set_function(lambda limiter=limiter: limiter.running)
+    CACHE_ENTRIES.labels("context").set_function(
+        lambda: pool.context_cache.stats()["entries"]
+    )
+    CACHE_BYTES.labels("context").set_function(lambda: pool.context_cache.stats()["bytes"])
+    CACHE_HIT_RATIO.labels("context").set_function(
+        lambda: _hit_ratio(pool.context_cache.stats())
+    )
+    CACHE_ENTRIES.labels("tts").set_function(lambda: pool.tts_cache.stats()["entries"])
+    CACHE_BYTES.labels("tts").set_function(lambda: pool.tts_cache.stats()["bytes"])
+    CACHE_HIT_RATIO.labels("tts").set_function(lambda: pool.tts_cache.stats()["hit_ratio"])
+    if pool.response_cache:
+        CACHE_ENTRIES.labels("llm").set_function(
+            lambda: pool.response_cache.stats()["entries"]
+        )
+        CACHE_BYTES.labels("llm").set_function(lambda: pool.response_cache.stats()["bytes"])
+        CACHE_HIT_RATIO.labels("llm").set_function(
+            lambda: pool.response_cache.stats()["hit_ratio"]
+        )
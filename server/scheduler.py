@@ -0,0 +1,161 @@
+from typing import AsyncIterator, Dict, List, Optional
+from contextlib import asynccontextmanager
+from config import config
+import asyncio
+import itertools
+import logging
+import metrics
+import time
+
+
+class SchedulerBusy(Exception):
+    """A turn was turned away because too many are already waiting."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Too many turns waiting ({reason})")
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("key", "start", "finish", "seq", "future")
+
+    def __init__(self, key: str, start: float, finish: float, seq: int):
+        self.key = key
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class FairLimiter:
+    """Caps concurrent use of one provider, in total and per session, and hands
+    free slots to waiting sessions in weighted fair order.
+
+    Start-time fair queueing: every request is tagged with a virtual finish time
+    of max(virtual clock, the session's last finish) + 1 / weight and the lowest
+    tag runs next. A session with a burst of requests queues behind the others
+    instead of ahead of them, and a higher weight gets a larger share.
+    """
+
+    def __init__(self, name: str, concurrency: int, session_concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.session_concurrency = session_concurrency
+        self.running = 0
+        self._running_by_key: Dict[str, int] = {}
+        self._waiting: List[_Waiter] = []
+        self._virtual_time = 0.0
+        # Only kept while a session has requests running or waiting
+        self._last_finish: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def queued(self, key: Optional[str] = None) -> int:
+        if key is None:
+            return len(self._waiting)
+        return sum(1 for waiter in self._waiting if waiter.key == key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": self.running,
+            "queued": len(self._waiting),
+            "sessions": len(self._last_finish),
+        }
+
+    @asynccontextmanager
+    async def slot(self, key: str, weight: float = 1.0) -> AsyncIterator[None]:
+        started = time.perf_counter()
+        await self.acquire(key, weight)
+        metrics.observe(f"{self.name}_queue", time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    async def acquire(self, key: str, weight: float = 1.0) -> None:
+        start = max(self._virtual_time, self._last_finish.get(key, 0.0))
+        waiter = _Waiter(key, start, start + 1 / weight, next(self._seq))
+        self._last_finish[key] = waiter.finish
+        self._waiting.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                self._waiting.remove(waiter)
+                self._forget_if_idle(key)
+            else:
+                # Granted just as it was cancelled: pass the slot on
+                self.release(key)
+            raise
+
+    def release(self, key: str) -> None:
+        self.running -= 1
+        self._running_by_key[key] -= 1
+        if not self._running_by_key[key]:
+            del self._running_by_key[key]
+        self._forget_if_idle(key)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.running < self.concurrency:
+            eligible = [
+                waiter
+                for waiter in self._waiting
+                if self._running_by_key.get(waiter.key, 0) < self.session_concurrency
+            ]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (w.finish, w.seq))
+            self._waiting.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start)
+            self.running += 1
+            self._running_by_key[waiter.key] = self._running_by_key.get(waiter.key, 0) + 1
+            waiter.future.set_result(None)
+
+    def _forget_if_idle(self, key: str) -> None:
+        if key not in self._running_by_key and not self.queued(key):
+            self._last_finish.pop(key, None)
+
+
+class TurnScheduler:
+    """Admission control and fair sharing of the LLM and TTS between sessions.
+
+    Turns take an "llm" slot while the model generates and a "tts" slot while
+    audio is synthesized. A new turn is turned away with SchedulerBusy once too
+    many turns are waiting for the LLM, overall or for its session; turns that
+    got in always finish, so TTS never sheds.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.limiters = {
+            "llm": FairLimiter(
+                "llm", config["llm_concurrency"], config["llm_session_concurrency"]
+            ),
+            "tts": FairLimiter(
+                "tts", config["tts_concurrency"], config["tts_session_concurrency"]
+            ),
+        }
+        self.max_queued = config["turn_queue_max"]
+        self.max_session_queued = config["turn_queue_session_max"]
+        self.rejected = 0
+
+    def admit(self, key: str) -> None:
+        """Raise SchedulerBusy if a new turn for this session would queue too deep."""
+        llm = self.limiters["llm"]
+        if llm.queued() >= self.max_queued:
+            reason = "global"
+        elif llm.queued(key) >= self.max_session_queued:
+            reason = "session"
+        else:
+            return
+        self.rejected += 1
+        metrics.SCHEDULER_REJECTED.labels(reason).inc()
+        self.logger.warning("Turning away a turn, %s queue full", reason)
+        raise SchedulerBusy(reason)
+
+    def slot(self, resource: str, key: str, weight: float = 1.0):
+        return self.limiters[resource].slot(key, weight)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
@@ -0,0 +1,88 @@
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+from config import config
+import asyncio
+import json
+import logging
+import uuid
+
+if TYPE_CHECKING:
+    from db_manager import AsyncDBManager
+
+# Receives the session id a signal is about
+SignalHandler = Callable[[str], Awaitable[None]]
+
+
+class SessionBus:
+    """Signals between the workers serving sessions, over Redis pub/sub.
+
+    Session state lives in Redis, so any worker can serve any session. Work in
+    flight (a turn being generated) and cached copies of state stay in the
+    worker's memory, so they are reached with a signal on a channel that every
+    worker subscribes to. Workers ignore their own signals.
+    """
+
+    def __init__(self, db: "AsyncDBManager", channel: Optional[str] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.db = db
+        self.channel = config["session_bus_channel"] if channel is None else channel
+        self.retry_seconds = config["session_bus_retry_seconds"]
+        self.worker_id = uuid.uuid4().hex
+        self.handlers: Dict[str, List[SignalHandler]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.channel)
+
+    def subscribe(self, signal: str, handler: SignalHandler) -> None:
+        self.handlers.setdefault(signal, []).append(handler)
+
+    async def publish(self, signal: str, session_id: str) -> None:
+        if not self.enabled or not session_id:
+            return
+        message = {"signal": signal, "session": session_id, "origin": self.worker_id}
+        try:
+            await self.db.redis_client.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            self.logger.warning("Could not publish %s for %s: %s", signal, session_id, str(e))
+
+    def start(self) -> None:
+        """Start listening, once, from inside the event loop."""
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.db.redis_client.pubsub(
+                    ignore_subscribe_messages=True
+                ) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Signals sent while resubscribing are lost; they are all best effort
+                self.logger.error("Session bus listener failed: %s", str(e))
+                await asyncio.sleep(self.retry_seconds)
+
+    async def _dispatch(self, data: str) -> None:
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            self.logger.warning("Ignoring malformed session bus message")
+            return
+        if message.get("origin") == self.worker_id:
+            return
+        for handler in self.handlers.get(message.get("signal"), []):
+            try:
+                await handler(message.get("session"))
+            except Exception as e:
+                self.logger.error("Handler for %s failed: %s", message.get("signal"), str(e))
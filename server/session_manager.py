@@ -0,0 +1,169 @@
+from db_manager import AsyncDBManager
+from llm import GeminiLLM
+from connection import Connection
+from tts import TTS, TTS_PROVIDERS, create_tts
+from audio import MediaStore
+from context_cache import SessionContextCache
+from session_bus import SessionBus
+from tts_cache import TTSCache
+from llm_cache import ResponseCache
+from scheduler import TurnScheduler
+from transcript_archive import TranscriptArchiver
+from stt import STT, create_stt
+from config import config
+from fastapi import WebSocket
+from typing import Coroutine, Dict, Optional, Set
+from dotenv import load_dotenv
+import asyncio
+import importlib
+import logging
+import time
+
+load_dotenv()
+
+# Provider SDKs by config value; importing them is most of a cold start
+PROVIDER_MODULES = {"gemini": "google.genai", "cartesia": "cartesia"}
+
+
+class ClientPool:
+    """Shares the expensive provider clients (Gemini, Cartesia, Redis) across sessions.
+    Session state is kept in Redis rather than here, so workers are interchangeable.
+
+    Provider clients are built on first use. start() warms them up in the
+    background instead, so the server accepts sockets before the SDKs have loaded.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.tts_class = TTS_PROVIDERS[config["tts_provider"]]
+        self._tts = None
+        self.tts_cache = TTSCache()
+        self.scheduler = TurnScheduler()
+        self.db = AsyncDBManager()
+        self.bus = SessionBus(self.db)
+        self.archiver = TranscriptArchiver(self.db)
+        self.context_cache = SessionContextCache(self.db, bus=self.bus)
+        self.response_cache = (
+            ResponseCache(self.db if config["llm_cache_shared"] else None)
+            if config["llm_cache_enabled"]
+            else None
+        )
+        self._llm: Optional[GeminiLLM] = None
+        self._stt: Optional[STT] = None
+        self.media_store = MediaStore()
+        self.media_store.cleanup()
+        self._background: Set[asyncio.Task] = set()
+        self._warm_up: Optional[asyncio.Task] = None
+        self.clients_ready = False
+
+    @property
+    def llm(self) -> GeminiLLM:
+        if self._llm is None:
+            self._llm = GeminiLLM(
+                session_cache=self.context_cache, response_cache=self.response_cache
+            )
+            self._stt = create_stt(client=self._llm.client)
+        return self._llm
+
+    @property
+    def stt(self) -> Optional[STT]:
+        # Built along with the LLM, whose client it shares
+        self.llm
+        return self._stt
+
+    @property
+    def tts(self) -> TTS:
+        """Built on first use, so text-only deployments never create a TTS client."""
+        if self._tts is None:
+            self._tts = create_tts()
+        return self._tts
+
+    def start(self) -> None:
+        """Start background work; call from inside the event loop at startup."""
+        self.bus.start()
+        self.archiver.start()
+        if self._warm_up is None:
+            self._warm_up = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self) -> None:
+        """Import the provider SDKs in a thread, then build the clients on the loop."""
+        started = time.perf_counter()
+        modules = [PROVIDER_MODULES["gemini"]]
+        if config["tts_enabled"] and config["tts_provider"] in PROVIDER_MODULES:
+            modules.append(PROVIDER_MODULES[config["tts_provider"]])
+        try:
+            await asyncio.to_thread(lambda: [importlib.import_module(m) for m in modules])
+            self.llm
+            if config["tts_enabled"]:
+                self.tts
+        except Exception as e:
+            # Clients are retried on first use, where the error reaches the user
+            self.logger.error("Warming up provider clients failed: %s", str(e))
+            return
+        self.clients_ready = True
+        self.logger.info("Provider clients ready in %.2fs", time.perf_counter() - started)
+
+    async def close(self) -> None:
+        """Finish outstanding work and close the shared clients, on shutdown."""
+        if self._warm_up and not self._warm_up.done():
+            self._warm_up.cancel()
+            await asyncio.gather(self._warm_up, return_exceptions=True)
+        await self.drain()
+        await self.bus.stop()
+        await self.archiver.stop()
+        if self._tts is not None:
+            await self._tts.close()
+        await self.db.close()
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        """Fire-and-forget work (e.g. persistence) that must not hold up the next turn."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            self.logger.error("Background task failed: %s", str(task.exception()))
+
+    async def drain(self) -> None:
+        """Wait for outstanding background work, e.g. on shutdown."""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+
+class SessionManager:
+    """Creates an isolated Connection for every frontend socket."""
+
+    def __init__(self, pool: ClientPool = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pool = pool or ClientPool()
+        self.connections: Dict[int, Connection] = {}
+        self.pool.bus.subscribe("kill_streaming", self._kill_streaming)
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self.connections)
+
+    async def open(self, websocket: WebSocket) -> Connection:
+        self.pool.start()
+        connection = Connection(self.pool)
+        self.connections[id(connection)] = connection
+        try:
+            await connection.connect(websocket)
+        except Exception:
+            self.close(connection)
+            raise
+        return connection
+
+    def close(self, connection: Connection) -> None:
+        connection.disconnect()
+        self.connections.pop(id(connection), None)
+
+    async def _kill_streaming(self, session_id: str) -> None:
+        """kill_streaming sent to another worker, e.g. by a client that reconnected
+        there while this worker was still answering it."""
+        for connection in list(self.connections.values()):
+            if connection.turn_uuid == session_id:
+                self.pool.spawn(connection.cancel_turn())
@@ -0,0 +1,243 @@
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+from abc import ABC, abstractmethod
+from config import config
+from audio import mime_type_for, pcm_to_wav
+from vad import EnergyVAD
+import asyncio
+import logging
+import time
+import zlib
+
+if TYPE_CHECKING:
+    from google import genai
+
+# Receives the best transcript so far while the user is still talking
+PartialCallback = Callable[[str], Awaitable[None]]
+
+
+class STTStream(ABC):
+    """One utterance, transcribed while its audio is still arriving."""
+
+    def __init__(self, on_partial: Optional[PartialCallback] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.on_partial = on_partial
+
+    @abstractmethod
+    async def feed(self, chunk: bytes) -> None:
+        """Add audio. Must return without waiting on the provider."""
+        pass
+
+    @abstractmethod
+    async def finish(self) -> str:
+        """Transcript of the whole utterance, once the last chunk has been fed."""
+        pass
+
+    def close(self) -> None:
+        """Abandon the utterance and any transcription still in flight."""
+        pass
+
+    async def _publish(self, text: str) -> None:
+        if self.on_partial and text:
+            await self.on_partial(text)
+
+
+class STT(ABC):
+    """Streaming speech to text provider."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @abstractmethod
+    def open_stream(
+        self,
+        on_partial: Optional[PartialCallback] = None,
+        input_format: Optional[Dict] = None,
+    ) -> STTStream:
+        """input_format describes raw PCM input; None means recorder chunks."""
+        pass
+
+
+class GeminiSTTStream(STTStream):
+    """Gemini has no streaming recognition here, so raw PCM is transcribed in
+    segments in the background: every interval, only the audio since the last
+    segment is sent, with the transcript so far as a prefix for context. Segments
+    end at the quietest frame near the end of the audio so far, so words are
+    rarely cut in half. finish() only sends the remaining tail, and nothing if
+    the tail is silent.
+
+    Recorder chunks are fragments of one compressed file and can't be cut into
+    segments, so for those finish() returns nothing and the LLM hears the audio.
+    """
+
+    def __init__(
+        self,
+        stt: "GeminiSTT",
+        on_partial: Optional[PartialCallback],
+        input_format: Optional[Dict],
+    ):
+        super().__init__(on_partial)
+        self.stt = stt
+        self.input_format = input_format
+        self.audio = bytearray()
+        self.transcript = ""
+        # Audio up to here is in the transcript
+        self._covered = 0
+        self._last_started = 0.0
+        self._task: Optional[asyncio.Task] = None
+        if input_format:
+            self.vad = EnergyVAD(input_format["sample_rate"])
+            # Where to look for a pause to end a segment at
+            self._search_bytes = self.vad.frame_bytes * 10
+
+    async def feed(self, chunk: bytes) -> None:
+        if not self.input_format:
+            return
+        self.audio.extend(chunk)
+        if self._task and not self._task.done():
+            return
+        if time.monotonic() - self._last_started < self.stt.interval:
+            return
+        end = self._segment_end()
+        if end - self._covered < self._search_bytes:
+            return
+        self._task = asyncio.create_task(self._run_segment(end))
+
+    def _segment_end(self) -> int:
+        frame = self.vad.frame_bytes
+        last = len(self.audio) - frame
+        first = max(self._covered, last - self._search_bytes)
+        if last < first:
+            return self._covered
+        return min(
+            range(last, first - 1, -frame),
+            key=lambda start: self.vad.energy(self.audio[start : start + frame]),
+        )
+
+    def _has_speech(self, start: int, end: int) -> bool:
+        frame = self.vad.frame_bytes
+        return any(
+            self.vad.is_speech(self.audio[i : i + frame]) for i in range(start, end, frame)
+        )
+
+    async def _transcribe_segment(self, end: int) -> None:
+        start = self._covered
+        if self._has_speech(start, end):
+            segment = pcm_to_wav(bytes(self.audio[start:end]), self.input_format["sample_rate"])
+            text = await self.stt.transcribe(segment, previous=self.transcript)
+            self.transcript = f"{self.transcript} {text}".strip()
+        self._covered = end
+
+    async def _run_segment(self, end: int) -> None:
+        self._last_started = time.monotonic()
+        previous = self.transcript
+        try:
+            await self._transcribe_segment(end)
+        except Exception as e:
+            # The segment is retried with the next one
+            self.logger.warning("Partial transcription failed: %s", str(e))
+            return
+        if self.transcript != previous:
+            await self._publish(self.transcript)
+
+    async def finish(self) -> str:
+        if not self.input_format:
+            return ""
+        if self._task and not self._task.done():
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._covered < len(self.audio):
+            await self._transcribe_segment(len(self.audio))
+        return self.transcript
+
+    def close(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+
+class GeminiSTT(STT):
+    def __init__(
+        self,
+        client: Optional["genai.Client"] = None,
+        model_name: Optional[str] = None,
+        interval_ms: Optional[int] = None,
+    ):
+        from google import genai
+
+        super().__init__()
+        self.client = client or genai.Client()
+        self.model_name = model_name or config["stt_model"]
+        self.interval = (interval_ms or config["stt_interval_ms"]) / 1000
+        self.timeout = config["llm_timeout"]
+        self.max_audio_bytes = config["inline_audio_max_bytes"]
+        self.prompt = "Transcribe the speech in this audio verbatim. Reply with the transcript only, or nothing if there is no speech."
+        self.continue_prompt = (
+            'This audio continues an utterance that so far reads: "{previous}". '
+            "Transcribe only the speech in this audio verbatim. Reply with the new "
+            "words only, or nothing if there is no speech."
+        )
+
+    def open_stream(
+        self,
+        on_partial: Optional[PartialCallback] = None,
+        input_format: Optional[Dict] = None,
+    ) -> STTStream:
+        return GeminiSTTStream(self, on_partial, input_format)
+
+    async def transcribe(self, audio: bytes, previous: str = "") -> str:
+        """Transcript of the audio; previous is what was said before it, if anything."""
+        from google.genai import types
+
+        if len(audio) > self.max_audio_bytes:
+            raise ValueError("Utterance too long to transcribe inline")
+        response = await asyncio.wait_for(
+            self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=[
+                    self.continue_prompt.format(previous=previous) if previous else self.prompt,
+                    types.Part.from_bytes(data=audio, mime_type=mime_type_for(audio)),
+                ],
+            ),
+            timeout=self.timeout,
+        )
+        return (response.text or "").strip()
+
+
+class LocalSTTStream(STTStream):
+    """Deterministic stand-in: every chunk "transcribes" to one word picked from
+    a checksum of its bytes, so the same audio always gives the same text."""
+
+    WORDS = ["what", "is", "the", "weather", "like", "today", "tell", "me", "a", "joke"]
+
+    def __init__(self, on_partial: Optional[PartialCallback]):
+        super().__init__(on_partial)
+        self.words: List[str] = []
+
+    async def feed(self, chunk: bytes) -> None:
+        self.words.append(self.WORDS[zlib.crc32(chunk) % len(self.WORDS)])
+        await self._publish(" ".join(self.words))
+
+    async def finish(self) -> str:
+        return " ".join(self.words)
+
+
+class LocalSTT(STT):
+    def open_stream(
+        self,
+        on_partial: Optional[PartialCallback] = None,
+        input_format: Optional[Dict] = None,
+    ) -> STTStream:
+        return LocalSTTStream(on_partial)
+
+
+def create_stt(
+    provider: Optional[str] = None, client: Optional["genai.Client"] = None
+) -> Optional[STT]:
+    """STT for config["stt_provider"]. None leaves recognition to the LLM, which
+    then gets the utterance audio itself."""
+    provider = config["stt_provider"] if provider is None else provider
+    if not provider:
+        return None
+    if provider == "gemini":
+        return GeminiSTT(client=client)
+    if provider == "local":
+        return LocalSTT()
+    raise ValueError(f"Unknown STT provider: {provider}")
@@ -0,0 +1,97 @@
+from typing import List, Optional
+from config import config
+import re
+
+
+class ResponseFieldParser:
+    """Incrementally decodes the "response" string of a streamed TranscriptItem JSON.
+
+    Gemini streams the structured output as raw JSON text, so the spoken part
+    can be surfaced before the closing brace arrives.
+    """
+
+    _KEY = re.compile(r'"response"\s*:\s*"')
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        self.buffer = ""
+        self.position: Optional[int] = None
+        self.done = False
+
+    def feed(self, text: str) -> str:
+        """Add raw JSON text and return any newly decoded response characters."""
+        self.buffer += text
+        if self.done:
+            return ""
+
+        if self.position is None:
+            match = self._KEY.search(self.buffer)
+            if not match:
+                return ""
+            self.position = match.end()
+
+        decoded = []
+        i = self.position
+        while i < len(self.buffer):
+            char = self.buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != "\\":
+                decoded.append(char)
+                i += 1
+                continue
+
+            # Wait for the rest of a split escape sequence
+            if i + 1 >= len(self.buffer):
+                break
+            code = self.buffer[i + 1]
+            if code == "u":
+                if i + 6 > len(self.buffer):
+                    break
+                codepoint = int(self.buffer[i + 2 : i + 6], 16)
+                # Emojis arrive as a \uD83D\uDE00 style surrogate pair
+                if 0xD800 <= codepoint < 0xDC00:
+                    if i + 12 > len(self.buffer):
+                        break
+                    low = int(self.buffer[i + 8 : i + 12], 16)
+                    codepoint = 0x10000 + ((codepoint - 0xD800) << 10) + (low - 0xDC00)
+                    i += 6
+                decoded.append(chr(codepoint))
+                i += 6
+            else:
+                decoded.append(self._ESCAPES.get(code, code))
+                i += 2
+
+        self.position = i
+        return "".join(decoded)
+
+
+class SentenceSplitter:
+    """Buffers streamed text and releases it one sentence at a time."""
+
+    _BOUNDARY = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+
+    def __init__(self, min_chars: Optional[int] = None):
+        self.min_chars = min_chars or config["tts_min_sentence_chars"]
+        self.pending = ""
+
+    def feed(self, text: str) -> List[str]:
+        self.pending += text
+        sentences = []
+        start = 0
+        for match in self._BOUNDARY.finditer(self.pending):
+            # Very short fragments ("Hi! ") sound choppy as separate requests
+            if match.end() - start < self.min_chars:
+                continue
+            sentence = self.pending[start : match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.pending = self.pending[start:]
+        return sentences
+
+    def flush(self) -> str:
+        sentence, self.pending = self.pending.strip(), ""
+        return sentence
@@ -0,0 +1,226 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from config import config
+from redis.client import NEVER_DECODE
+from redis.exceptions import WatchError
+import asyncio
+import json
+import logging
+import metrics
+import time
+import zlib
+
+if TYPE_CHECKING:
+    from db_manager import AsyncDBManager
+
+# Archived transcript items and the context at the time of archiving
+Archive = Tuple[List[Dict], str]
+
+# First byte of a blob names the codec, so either can be read back
+_CODECS = {"zlib": b"z", "zstd": b"s"}
+
+# Clients decode responses; blobs must come back as bytes
+RAW = {NEVER_DECODE: []}
+
+
+def archive_key(session_id: str) -> str:
+    return f"session:{session_id}:archive"
+
+
+def encode_archive(items: List[Dict], context: str, codec: Optional[str] = None) -> bytes:
+    """Compress transcript items and context into one blob. Items are stored as
+    [query, response] pairs instead of objects to leave out the repeated keys."""
+    codec = codec or config["archive_codec"]
+    payload = json.dumps(
+        {
+            "t": [[item.get("query", ""), item.get("response", "")] for item in items],
+            "c": context,
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode()
+    level = config["archive_compression_level"]
+    if codec == "zstd":
+        import zstandard
+
+        return _CODECS[codec] + zstandard.ZstdCompressor(level=level).compress(payload)
+    return _CODECS["zlib"] + zlib.compress(payload, level)
+
+
+def decode_archive(blob: bytes) -> Archive:
+    header, body = blob[:1], blob[1:]
+    if header == _CODECS["zstd"]:
+        import zstandard
+
+        payload = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        payload = zlib.decompress(body)
+    data = json.loads(payload)
+    return [{"query": query, "response": response} for query, response in data["t"]], data["c"]
+
+
+class ArchiveCache:
+    """Inflated archives, so paging through a cold session decompresses it once.
+    Entries are tagged with the archived item count, which changes when a
+    session is archived again."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or config["archive_cache_max_entries"]
+        self._entries: "OrderedDict[str, Tuple[int, Archive]]" = OrderedDict()
+
+    def get(self, session_id: str, count: int) -> Optional[Archive]:
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] != count:
+            return None
+        self._entries.move_to_end(session_id)
+        return entry[1]
+
+    def put(self, session_id: str, count: int, archive: Archive) -> None:
+        self._entries[session_id] = (count, archive)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+
+
+class TranscriptArchiver:
+    """Moves idle sessions from the hot tier into compressed blobs.
+
+    A session idle for archive_idle_seconds has its transcript list and context
+    folded into `session:{id}:archive`, and its item count kept in the meta hash
+    as "archived". Turns added later go to the hot list again and are folded in
+    on the next run, so the archive is always a prefix of the transcript. The
+    blob and meta expire archive_ttl_seconds after archiving; new turns clear
+    the expiry. Every worker runs the job, but a Redis lock lets only one run
+    per interval.
+    """
+
+    LOCK_KEY = "archive:lock"
+
+    def __init__(self, db: "AsyncDBManager"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.db = db
+        self.idle_seconds = config["archive_idle_seconds"]
+        self.ttl_seconds = config["archive_ttl_seconds"]
+        self.interval_seconds = config["archive_interval_seconds"]
+        self.batch_size = config["archive_batch_size"]
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if config["archive_enabled"] and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                locked = await self.db.redis_client.set(
+                    self.LOCK_KEY, "1", nx=True, ex=max(1, int(self.interval_seconds))
+                )
+                if locked:
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error("Archiving sessions failed: %s", str(e))
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Archive every idle session once; returns what was archived and saved."""
+        started = time.perf_counter()
+        cutoff = (now or time.time()) - self.idle_seconds
+        report = {
+            "sessions": 0,
+            "archived": 0,
+            "expired": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+        }
+        client = self.db.redis_client
+        offset = 0
+        while True:
+            batch = await client.zrange(
+                "sessions", offset, offset + self.batch_size - 1, withscores=True
+            )
+            if not batch:
+                break
+            offset += len(batch)
+            async with client.pipeline(transaction=False) as pipe:
+                for session_id, _ in batch:
+                    pipe.hget(f"session:{session_id}:meta", "updated")
+                    pipe.exists(f"session:{session_id}", f"session:{session_id}:context")
+                    pipe.exists(f"session:{session_id}:meta", archive_key(session_id))
+                results = await pipe.execute()
+            for i, (session_id, created) in enumerate(batch):
+                updated, hot, cold = results[3 * i : 3 * i + 3]
+                report["sessions"] += 1
+                if not hot and not cold:
+                    # Expired after archiving
+                    await client.zrem("sessions", session_id)
+                    offset -= 1
+                    report["expired"] += 1
+                elif hot and float(updated or created) < cutoff:
+                    # Sessions with nothing hot left are already archived
+                    saved = await self.archive_session(session_id)
+                    if saved:
+                        report["archived"] += 1
+                        report["bytes_before"] += saved[0]
+                        report["bytes_after"] += saved[1]
+
+        report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+        report["seconds"] = time.perf_counter() - started
+        metrics.ARCHIVED_SESSIONS.inc(report["archived"])
+        metrics.ARCHIVE_BYTES_SAVED.inc(max(0, report["bytes_saved"]))
+        self.logger.info(
+            "Archived %d of %d sessions in %.2fs, %d bytes down to %d (%d saved), %d expired",
+            report["archived"],
+            report["sessions"],
+            report["seconds"],
+            report["bytes_before"],
+            report["bytes_after"],
+            report["bytes_saved"],
+            report["expired"],
+        )
+        return report
+
+    async def archive_session(self, session_id: str) -> Optional[Tuple[int, int]]:
+        """Fold a session's hot transcript and context into its archive. Returns
+        payload bytes before and after, or None if there was nothing to move or
+        the session changed meanwhile."""
+        transcript_key = f"session:{session_id}"
+        context_key = f"session:{session_id}:context"
+        meta_key = f"session:{session_id}:meta"
+        blob_key = archive_key(session_id)
+        async with self.db.redis_client.pipeline(transaction=True) as pipe:
+            try:
+                # A turn saved while archiving aborts the transaction below
+                await pipe.watch(transcript_key, context_key, blob_key)
+                entries = await pipe.lrange(transcript_key, 0, -1)
+                context = await pipe.get(context_key)
+                if not entries and context is None:
+                    return None
+                old_blob = await pipe.execute_command("GET", blob_key, **RAW)
+                items, old_context = decode_archive(old_blob) if old_blob else ([], "")
+                items += [json.loads(entry) for entry in entries]
+                blob = encode_archive(items, old_context if context is None else context)
+
+                pipe.multi()
+                pipe.set(blob_key, blob)
+                pipe.delete(transcript_key, context_key)
+                pipe.hset(meta_key, "archived", len(items))
+                if self.ttl_seconds:
+                    pipe.expire(blob_key, self.ttl_seconds)
+                    pipe.expire(meta_key, self.ttl_seconds)
+                await pipe.execute()
+            except WatchError:
+                return None
+        before = sum(len(entry.encode()) for entry in entries)
+        before += len((context or "").encode()) + (len(old_blob) if old_blob else 0)
+        return before, len(blob)
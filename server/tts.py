@@ -0,0 +1,363 @@
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from abc import ABC, abstractmethod
+from config import config
+from voices import load_voice
+import array
+import asyncio
+import logging
+import math
+import os
+import time
+
+# Bytes per sample for the raw encodings Cartesia can return
+SAMPLE_WIDTHS = {"pcm_s16le": 2, "pcm_f32le": 4, "pcm_mulaw": 1, "pcm_alaw": 1}
+
+
+def negotiate_output_format(
+    requested: Iterable[str], encodings: Optional[Iterable[str]] = None
+) -> Tuple[str, Dict]:
+    """Pick the first format the client accepts that we offer, else the default.
+    Pass the provider's supported encodings to skip formats it can't produce."""
+    formats = config["tts_output_formats"]
+    if encodings is not None:
+        encodings = set(encodings)
+        formats = {
+            name: output_format
+            for name, output_format in formats.items()
+            if output_format["encoding"] in encodings
+        }
+    for name in requested:
+        if name in formats:
+            return name, formats[name]
+    name = config["tts_output_format"]
+    if name not in formats:
+        name = next(iter(formats))
+    return name, formats[name]
+
+
+class AudioCoalescer:
+    """Merges small PCM chunks into frames holding a fixed duration of audio."""
+
+    def __init__(self, output_format: Dict, target_ms: int, max_ms: int):
+        sample_width = SAMPLE_WIDTHS.get(output_format.get("encoding"), 2)
+        bytes_per_ms = output_format["sample_rate"] * sample_width / 1000
+        # Frames must end on a sample boundary or the client decodes garbage
+        self.target_bytes = self._align(bytes_per_ms * target_ms, sample_width)
+        self.max_bytes = self._align(bytes_per_ms * max_ms, sample_width)
+        self.sample_width = sample_width
+        self.buffer = bytearray()
+
+    @staticmethod
+    def _align(size: float, sample_width: int) -> int:
+        return max(sample_width, int(size) // sample_width * sample_width)
+
+    def add(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+
+    def ready(self) -> bool:
+        return len(self.buffer) >= self.target_bytes
+
+    def full(self) -> bool:
+        return len(self.buffer) >= self.max_bytes
+
+    def take(self) -> bytes:
+        """Pop up to max_bytes of sample-aligned audio."""
+        size = min(len(self.buffer), self.max_bytes)
+        size -= size % self.sample_width
+        frame = bytes(memoryview(self.buffer)[:size])
+        del self.buffer[:size]
+        return frame
+
+    def clear(self) -> None:
+        self.buffer.clear()
+
+
+class AudioWriter:
+    """Sends coalesced frames to the frontend without letting a slow socket pile up
+    frames in memory: while a send is in flight, incoming audio keeps merging into
+    the next (larger) frame instead of queueing more of them."""
+
+    def __init__(
+        self,
+        send_bytes: Callable[[bytes], Awaitable[None]],
+        output_format: Dict,
+        target_ms: Optional[int] = None,
+        max_ms: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.send_bytes = send_bytes
+        self.coalescer = AudioCoalescer(
+            output_format,
+            target_ms or config["tts_frame_ms"],
+            max_ms or config["tts_max_frame_ms"],
+        )
+        self.queue: asyncio.Queue = asyncio.Queue(
+            maxsize=max_pending or config["tts_send_queue_frames"]
+        )
+        self.bytes_sent = 0
+        self._drain_task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while (frame := await self.queue.get()) is not None:
+            await self.send_bytes(frame)
+            self.bytes_sent += len(frame)
+
+    async def write(self, chunk: bytes) -> None:
+        if self._drain_task.done():
+            # Surface send errors to the producer
+            self._drain_task.result()
+            return
+        self.coalescer.add(chunk)
+        while self.coalescer.ready():
+            if self.queue.full() and not self.coalescer.full():
+                return
+            await self.queue.put(self.coalescer.take())
+
+    async def close(self) -> None:
+        """Flush remaining audio and wait until it has been sent."""
+        while self.coalescer.buffer:
+            await self.queue.put(self.coalescer.take())
+        await self.queue.put(None)
+        await self._drain_task
+
+    def abort(self) -> None:
+        self.coalescer.clear()
+        self._drain_task.cancel()
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+class TTS(ABC):
+    """Streaming text to speech provider."""
+
+    # Raw encodings the provider can stream, used during format negotiation
+    supported_encodings = frozenset(SAMPLE_WIDTHS)
+
+    def __init__(self, model_id: str, voice_embedding: List[float]):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.model_id = model_id
+        self.voice_embedding = voice_embedding
+
+    def supports(self, output_format: Dict) -> bool:
+        return (
+            output_format.get("container") == "raw"
+            and output_format.get("encoding") in self.supported_encodings
+        )
+
+    @abstractmethod
+    def synthesize(
+        self,
+        text: Union[str, AsyncIterator[str]],
+        output_format: Dict,
+        voice_embedding: Optional[List[float]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield raw audio in output_format for a string, or for an async stream of
+        sentences spoken as one utterance. Closing the iterator, or cancelling the
+        task consuming it, cancels the in-flight synthesis."""
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class CartesiaTTS(TTS):
+    """Async Cartesia engine. All sessions share one websocket and every utterance
+    gets its own context, so nothing here blocks the event loop."""
+
+    def __init__(self, api_key: str, model_id: str, voice_embedding: List[float]):
+        # Imported here so deployments using another provider never load the SDK
+        from cartesia import AsyncCartesia
+
+        super().__init__(model_id, voice_embedding)
+        self.client = AsyncCartesia(api_key=api_key)
+        self._websocket = None
+        self._websocket_lock = asyncio.Lock()
+
+    async def _get_websocket(self):
+        async with self._websocket_lock:
+            # Contexts reconnect the socket on send if it has dropped
+            if self._websocket is None:
+                self._websocket = await self.client.tts.websocket()
+            return self._websocket
+
+    async def synthesize(
+        self,
+        text: Union[str, AsyncIterator[str]],
+        output_format: Dict,
+        voice_embedding: Optional[List[float]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield audio for a string, or for an async stream of sentences which are
+        sent as continuations on a single context."""
+        sentences = _single(text) if isinstance(text, str) else text
+        websocket = await self._get_websocket()
+        tts_context = websocket.context()
+
+        async def feed() -> None:
+            async for sentence in sentences:
+                await tts_context.send(
+                    model_id=self.model_id,
+                    transcript=sentence,
+                    output_format=output_format,
+                    voice_embedding=voice_embedding or self.voice_embedding,
+                    continue_=True,
+                    _experimental_voice_controls={"emotion": ["positivity:highest"]},
+                )
+            await tts_context.no_more_inputs()
+
+        feeder = asyncio.create_task(feed())
+        receiver = tts_context.receive()
+        next_chunk = None
+        finished = False
+        try:
+            while True:
+                next_chunk = asyncio.ensure_future(anext(receiver, None))
+                if not feeder.done():
+                    # Don't sit on the receive timeout if sending already failed
+                    await asyncio.wait(
+                        {next_chunk, feeder}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if feeder.done() and feeder.exception():
+                        next_chunk.cancel()
+                        raise feeder.exception()
+                output = await next_chunk
+                if output is None:
+                    finished = True
+                    break
+                yield output["audio"]
+        finally:
+            feeder.cancel()
+            # The receiver can't be closed while a pending read is still inside it
+            if next_chunk is not None:
+                next_chunk.cancel()
+            await asyncio.gather(
+                feeder, *([next_chunk] if next_chunk else []), return_exceptions=True
+            )
+            await receiver.aclose()
+            if not finished:
+                await self._cancel_context(websocket, tts_context.context_id)
+
+    async def _cancel_context(self, websocket, context_id: str) -> None:
+        """Stop generation on Cartesia's side too; the SDK only drops the context locally."""
+        try:
+            await websocket.websocket.send_json({"context_id": context_id, "cancel": True})
+        except Exception as e:
+            self.logger.warning("Could not cancel TTS context %s: %s", context_id, str(e))
+
+    async def close(self) -> None:
+        if self._websocket is not None:
+            await self._websocket.close()
+            self._websocket = None
+        await self.client.close()
+
+
+def _mulaw_encode(sample: int) -> int:
+    sign = 0x80 if sample < 0 else 0
+    magnitude = min(abs(sample), 32635) + 0x84
+    exponent = max(0, magnitude.bit_length() - 8)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+class LocalTTS(TTS):
+    """Deterministic offline stand-in that "speaks" a tone for as long as the text
+    would take to read aloud. Latency and pacing are simulated, so the whole
+    pipeline can be load tested and timed without network access."""
+
+    supported_encodings = frozenset({"pcm_s16le", "pcm_f32le", "pcm_mulaw"})
+
+    def __init__(
+        self,
+        model_id: str = "local-tone",
+        voice_embedding: Optional[List[float]] = None,
+        first_chunk_ms: Optional[int] = None,
+        speedup: Optional[float] = None,
+        chunk_ms: int = 40,
+        chars_per_second: float = 15.0,
+        frequency: float = 220.0,
+    ):
+        super().__init__(model_id, voice_embedding or [])
+        self.first_chunk_ms = (
+            first_chunk_ms
+            if first_chunk_ms is not None
+            else config["local_tts_first_chunk_ms"]
+        )
+        self.speedup = speedup if speedup is not None else config["local_tts_speedup"]
+        self.chunk_ms = chunk_ms
+        self.chars_per_second = chars_per_second
+        self.frequency = frequency
+        self._chunks: Dict[Tuple[str, int], bytes] = {}
+
+    def _tone_chunk(self, output_format: Dict) -> bytes:
+        """One chunk_ms chunk of tone, generated once per format."""
+        encoding = output_format["encoding"]
+        sample_rate = output_format["sample_rate"]
+        chunk = self._chunks.get((encoding, sample_rate))
+        if chunk is None:
+            count = sample_rate * self.chunk_ms // 1000
+            wave = [
+                0.3 * math.sin(2 * math.pi * self.frequency * i / sample_rate)
+                for i in range(count)
+            ]
+            if encoding == "pcm_f32le":
+                chunk = array.array("f", wave).tobytes()
+            elif encoding == "pcm_mulaw":
+                chunk = bytes(_mulaw_encode(int(x * 32767)) for x in wave)
+            else:
+                chunk = array.array("h", (int(x * 32767) for x in wave)).tobytes()
+            self._chunks[(encoding, sample_rate)] = chunk
+        return chunk
+
+    async def synthesize(
+        self,
+        text: Union[str, AsyncIterator[str]],
+        output_format: Dict,
+        voice_embedding: Optional[List[float]] = None,
+    ) -> AsyncIterator[bytes]:
+        if not self.supports(output_format):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        sentences = _single(text) if isinstance(text, str) else text
+        chunk = self._tone_chunk(output_format)
+        chunk_seconds = self.chunk_ms / 1000
+        first = True
+        async for sentence in sentences:
+            count = math.ceil(len(sentence) / self.chars_per_second / chunk_seconds)
+            started = time.monotonic()
+            if first:
+                await asyncio.sleep(self.first_chunk_ms / 1000)
+                started = time.monotonic()
+                first = False
+            for index in range(count):
+                if self.speedup:
+                    # Pace output like a provider generating faster than realtime
+                    due = started + index * chunk_seconds / self.speedup
+                    await asyncio.sleep(max(0.0, due - time.monotonic()))
+                yield chunk
+
+
+# Providers selectable with config["tts_provider"]
+TTS_PROVIDERS = {"cartesia": CartesiaTTS, "local": LocalTTS}
+
+
+def create_tts(provider: Optional[str] = None) -> TTS:
+    provider = provider or config["tts_provider"]
+    if provider == "cartesia":
+        return CartesiaTTS(
+            api_key=os.getenv("CARTESIA_API_KEY", ""),
+            model_id=config["model_id"],
+            voice_embedding=load_voice(config["voice"]),
+        )
+    if provider == "local":
+        return LocalTTS()
+    raise ValueError(f"Unknown TTS provider: {provider}")
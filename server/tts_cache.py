@@ -0,0 +1,206 @@
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Union
+from collections import OrderedDict
+from contextlib import aclosing
+from config import config
+import array
+import hashlib
+import json
+import logging
+import metrics
+import mmap
+import os
+
+if TYPE_CHECKING:
+    from tts import TTS
+
+CachedAudio = Union[bytes, mmap.mmap]
+
+
+class TTSCache:
+    """Content-addressed cache of synthesized PCM.
+
+    Keys cover everything that changes the audio: text, model, voice and output
+    format. Recent entries live in a byte-capped LRU; when a directory is set,
+    entries evicted from memory spill to disk and are replayed through mmap.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entry_bytes: Optional[int] = None,
+        directory: Optional[str] = None,
+        disk_max_bytes: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_bytes = max_bytes or config["tts_cache_max_bytes"]
+        self.max_entry_bytes = max_entry_bytes or config["tts_cache_max_entry_bytes"]
+        self.directory = (
+            directory if directory is not None else config["tts_cache_dir"]
+        )
+        self.disk_max_bytes = disk_max_bytes or config["tts_cache_disk_max_bytes"]
+        self.chunk_bytes = chunk_bytes or config["tts_cache_chunk_bytes"]
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if self.directory:
+            self._scan_disk()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    @staticmethod
+    def key(
+        text: str,
+        model_id: str,
+        voice_embedding: Union[str, List[float]],
+        output_format: Dict,
+    ) -> str:
+        digest = hashlib.sha256(text.strip().encode())
+        digest.update(b"\0" + model_id.encode() + b"\0")
+        if isinstance(voice_embedding, str):
+            digest.update(voice_embedding.encode())
+        else:
+            digest.update(array.array("f", voice_embedding).tobytes())
+        digest.update(b"\0" + json.dumps(output_format, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        audio = self._entries.get(key)
+        if audio is None and key in self._disk:
+            audio = self._open_disk(key)
+        if audio is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_saved += len(audio)
+        metrics.TTS_CACHE_BYTES_SAVED.inc(len(audio))
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return audio
+
+    def put(self, key: str, audio: bytes) -> None:
+        # Long answers are rarely repeated word for word and would flush the cache
+        if not audio or len(audio) > self.max_entry_bytes or key in self._entries:
+            return
+        self._entries[key] = audio
+        self._bytes += len(audio)
+        while len(self._entries) > 1 and self._bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._spill(evicted_key, evicted)
+
+    async def synthesize(
+        self,
+        tts: "TTS",
+        text: str,
+        output_format: Dict,
+        voice_embedding: Optional[List[float]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield cached audio for the text, or synthesize it and cache the result
+        once the utterance has completed."""
+        voice_embedding = voice_embedding or tts.voice_embedding
+        key = self.key(text, tts.model_id, voice_embedding, output_format)
+        cached = self.get(key)
+        if cached is not None:
+            async with aclosing(self._replay(cached)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        audio = bytearray()
+        async with aclosing(tts.synthesize(text, output_format, voice_embedding)) as chunks:
+            async for chunk in chunks:
+                if len(audio) <= self.max_entry_bytes:
+                    audio.extend(chunk)
+                yield chunk
+        self.put(key, bytes(audio))
+
+    async def _replay(self, audio: CachedAudio) -> AsyncIterator[bytes]:
+        # Chunked like a live synthesis so the AudioWriter frames hits the same way
+        view = memoryview(audio)
+        try:
+            for start in range(0, len(view), self.chunk_bytes):
+                yield bytes(view[start : start + self.chunk_bytes])
+        finally:
+            view.release()
+            if isinstance(audio, mmap.mmap):
+                audio.close()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def _scan_disk(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entries = sorted(
+            (
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(".pcm")
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            size = entry.stat().st_size
+            self._disk[entry.name[: -len(".pcm")]] = size
+            self._disk_bytes += size
+        self._prune_disk()
+
+    def _open_disk(self, key: str) -> Optional[mmap.mmap]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # mtime doubles as the LRU clock for the disk tier across restarts
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            self.logger.warning("Dropping unreadable cache file %s: %s", path, str(e))
+            self._disk_bytes -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        self.disk_hits += 1
+        return audio
+
+    def _spill(self, key: str, audio: bytes) -> None:
+        if not self.directory or key in self._disk:
+            return
+        path = self._path(key)
+        try:
+            # Write then rename so a concurrent reader never maps a partial file;
+            # workers sharing the directory each write their own temp file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning("Could not spill %s to disk: %s", key, str(e))
+            return
+        self._disk[key] = len(audio)
+        self._disk_bytes += len(audio)
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        while self._disk and self._disk_bytes > self.disk_max_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                self.logger.warning("Could not remove cached audio %s: %s", key, str(e))
@@ -0,0 +1,101 @@
+from typing import Optional
+from config import config
+import array
+import math
+import sys
+
+
+class EnergyVAD:
+    """Frame level speech detection on 16-bit PCM by RMS energy."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: Optional[int] = None,
+        threshold: Optional[int] = None,
+    ):
+        self.frame_ms = frame_ms or config["vad_frame_ms"]
+        self.frame_bytes = sample_rate * self.frame_ms // 1000 * 2
+        self.threshold = threshold or config["vad_energy_threshold"]
+
+    def energy(self, frame: bytes) -> float:
+        samples = array.array("h")
+        samples.frombytes(frame[: len(frame) // 2 * 2])
+        if sys.byteorder == "big":
+            samples.byteswap()
+        if not samples:
+            return 0.0
+        return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+    def is_speech(self, frame: bytes) -> bool:
+        return bool(frame) and self.energy(frame) >= self.threshold
+
+
+class Endpointer:
+    """Follows one utterance of 16-bit PCM as it streams in: where speech starts
+    and stops, and when the speaker has been quiet long enough to end the turn."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        end_silence_ms: Optional[int] = None,
+        min_speech_ms: Optional[int] = None,
+        padding_ms: Optional[int] = None,
+        vad: Optional[EnergyVAD] = None,
+    ):
+        self.vad = vad or EnergyVAD(sample_rate)
+        bytes_per_ms = sample_rate * 2 // 1000
+        self.end_silence_bytes = (end_silence_ms or config["vad_end_silence_ms"]) * bytes_per_ms
+        self.min_speech_frames = max(
+            1, (min_speech_ms or config["vad_min_speech_ms"]) // self.vad.frame_ms
+        )
+        self.padding_bytes = (
+            padding_ms if padding_ms is not None else config["vad_padding_ms"]
+        ) * bytes_per_ms
+
+        self._pending = bytearray()
+        self._offset = 0
+        self._run_start = 0
+        self._run_frames = 0
+        # Byte offsets into the utterance, set once speech has been heard
+        self.speech_start: Optional[int] = None
+        self.speech_end = 0
+
+    @property
+    def speech_started(self) -> bool:
+        return self.speech_start is not None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Classify the new audio. Returns True once speech has been followed by
+        end_silence_ms of silence."""
+        self._pending.extend(chunk)
+        frame_bytes = self.vad.frame_bytes
+        consumed = 0
+        while len(self._pending) - consumed >= frame_bytes:
+            frame = bytes(self._pending[consumed : consumed + frame_bytes])
+            consumed += frame_bytes
+            if self.vad.is_speech(frame):
+                if self._run_frames == 0:
+                    self._run_start = self._offset
+                self._run_frames += 1
+                # Isolated clicks and pops shorter than min_speech_ms don't count
+                if self._run_frames >= self.min_speech_frames:
+                    if self.speech_start is None:
+                        self.speech_start = self._run_start
+                    self.speech_end = self._offset + frame_bytes
+            else:
+                self._run_frames = 0
+            self._offset += frame_bytes
+        del self._pending[:consumed]
+        return (
+            self.speech_started
+            and self._offset - self.speech_end >= self.end_silence_bytes
+        )
+
+    def trim(self, audio: bytes) -> bytes:
+        """The speech in the utterance plus padding_ms either side; empty if none was heard."""
+        if self.speech_start is None:
+            return b""
+        start = max(0, self.speech_start - self.padding_bytes)
+        end = min(len(audio), self.speech_end + self.padding_bytes)
+        return bytes(memoryview(audio)[start:end])
@@ -0,0 +1,53 @@
+from typing import Dict, List, Optional
+from config import config
+import array
+import os
+import sys
+
+# Embeddings are stored as little-endian float32, one file per voice
+VOICE_EXTENSION = ".f32"
+
+
+def _voices_dir(directory: Optional[str] = None) -> str:
+    directory = directory or config["voices_dir"]
+    if os.path.isabs(directory):
+        return directory
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), directory)
+
+
+def list_voices(directory: Optional[str] = None) -> List[str]:
+    try:
+        names = os.listdir(_voices_dir(directory))
+    except OSError:
+        return []
+    return sorted(
+        name[: -len(VOICE_EXTENSION)] for name in names if name.endswith(VOICE_EXTENSION)
+    )
+
+
+_loaded: Dict[str, List[float]] = {}
+
+
+def load_voice(name: str, directory: Optional[str] = None) -> List[float]:
+    """Embedding for a named voice, read once per process."""
+    path = os.path.join(_voices_dir(directory), name + VOICE_EXTENSION)
+    if path not in _loaded:
+        embedding = array.array("f")
+        with open(path, "rb") as f:
+            embedding.frombytes(f.read())
+        if sys.byteorder == "big":
+            embedding.byteswap()
+        _loaded[path] = embedding.tolist()
+    return _loaded[path]
+
+
+def save_voice(name: str, embedding: List[float], directory: Optional[str] = None) -> str:
+    """Write an embedding, e.g. one copied from the Cartesia playground."""
+    path = os.path.join(_voices_dir(directory), name + VOICE_EXTENSION)
+    values = array.array("f", embedding)
+    if sys.byteorder == "big":
+        values.byteswap()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(values.tobytes())
+    return path